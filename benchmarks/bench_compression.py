@@ -0,0 +1,72 @@
+"""
+Benchmark for compression of cold buffer regions.
+Measures the resident memory saved by compressing a large buffer and the latency of reading it back.
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from pytedit.text_buffer import TextBuffer
+
+
+def measure(line_count, codec):
+    """
+    Compress a large log-like buffer and read random rows back
+    
+    Args:
+        line_count (int): Number of lines in the buffer
+        codec (str): Compression codec ('zlib' or 'lzma')
+    
+    Returns:
+        dict: Memory figures in bytes and timings in seconds
+    """
+    gc.collect()
+    tracemalloc.start()
+    buffer = TextBuffer()
+    buffer.lines = [f"2024-05-01 12:{i // 60 % 60:02d}:{i % 60:02d} INFO worker-{i % 16} "
+                    f"request {i} served in {i % 97} ms" for i in range(line_count)]
+    buffer.compression = codec
+    before = tracemalloc.get_traced_memory()[0]
+    
+    start = time.perf_counter()
+    buffer.compress_cold(idle=0)
+    compress_time = time.perf_counter() - start
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(1000):
+        row = rng.randrange(line_count)
+        buffer.lines[row:row + 50]  # A screenful at a random position
+    scroll_time = (time.perf_counter() - start) / 1000
+    
+    return {
+        'before_bytes': before,
+        'after_bytes': after,
+        'compress_time': compress_time,
+        'scroll_time': scroll_time,
+        'stats': buffer.compression_stats(),
+    }
+
+
+def main():
+    """Run the benchmark and print a report"""
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for codec in ('zlib', 'lzma'):
+        result = measure(line_count, codec)
+        stats = result['stats']
+        print(f"{line_count} lines, {codec}: "
+              f"resident {result['before_bytes'] / 2**20:.1f} MiB -> {result['after_bytes'] / 2**20:.1f} MiB "
+              f"(estimated {stats['uncompressed_bytes'] / 2**20:.1f} MiB -> {stats['resident_bytes'] / 2**20:.1f} MiB), "
+              f"compressed in {result['compress_time']:.2f}s, "
+              f"decompression {stats['decompress_latency'] * 1e3:.2f}ms per block, "
+              f"random screenful {result['scroll_time'] * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark for bulk line operations.
+Compares the time, retained memory and peak memory of the in-memory and external sorts.
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from pytedit import line_ops
+from pytedit.text_buffer import TextBuffer
+
+
+def make_buffer(line_count, external):
+    """Build a buffer of random lines, forcing the external sort if asked"""
+    rng = random.Random(1)
+    buffer = TextBuffer()
+    buffer.lines = [f"entry {rng.randrange(10**9)} with some payload text" for _ in range(line_count)]
+    if external:
+        buffer.external_sort_threshold = 0
+    return buffer
+
+
+def measure(line_count, external):
+    """
+    Sort a large buffer and measure the memory the sort allocates
+    
+    Args:
+        line_count (int): Number of lines in the buffer
+        external (bool): Force the external merge sort
+    
+    Returns:
+        dict: Elapsed seconds and retained and peak memory in bytes
+    """
+    buffer = make_buffer(line_count, external)
+    start = time.perf_counter()
+    buffer.sort_lines()
+    elapsed = time.perf_counter() - start
+    
+    # Measure memory on a fresh buffer, since tracing slows the sort down
+    buffer = make_buffer(line_count, external)
+    gc.collect()
+    tracemalloc.start()
+    buffer.sort_lines()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'elapsed': elapsed, 'retained_bytes': retained, 'peak_bytes': peak}
+
+
+def main():
+    """Run the benchmark and print a report"""
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    runs = [(False, line_ops.RUN_SIZE)] + [(True, size) for size in (line_ops.RUN_SIZE, line_count // 10)]
+    for external, run_size in runs:
+        line_ops.RUN_SIZE = run_size
+        result = measure(line_count, external)
+        name = f"external sort, {run_size} line runs" if external else "in-memory sort"
+        print(f"{line_count} lines, {name}: "
+              f"{result['elapsed']:.2f}s, "
+              f"retained {result['retained_bytes'] / 2**20:.1f} MiB, "
+              f"peak {result['peak_bytes'] / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Benchmark for TextBuffer snapshots.
+Measures snapshot time and the memory a snapshot keeps alive as the buffer is edited.
+"""
+
+import sys
+import timeit
+import tracemalloc
+
+from pytedit.text_buffer import TextBuffer
+
+
+def measure(line_count, edits):
+    """
+    Take a snapshot of a large buffer and edit the buffer afterwards
+    
+    Args:
+        line_count (int): Number of lines in the buffer
+        edits (int): Number of single-character edits after the snapshot
+    
+    Returns:
+        dict: Snapshot time and memory figures in bytes
+    """
+    buffer = TextBuffer()
+    buffer.lines = [f"log line {i} with some payload text" for i in range(line_count)]
+    
+    snapshot_time = timeit.timeit(buffer.snapshot, number=1000) / 1000
+    
+    tracemalloc.start()
+    snapshot = buffer.snapshot()
+    after_snapshot = tracemalloc.get_traced_memory()[0]
+    
+    step = max(1, line_count // edits)
+    for row in range(0, line_count, step):
+        buffer.cursor_row, buffer.cursor_col = row, 0
+        buffer.insert_char('x')
+    after_edits = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    tracemalloc.start()
+    copy = list(buffer.lines)
+    list_copy = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    return {
+        'snapshot_time': snapshot_time,
+        'snapshot_bytes': after_snapshot,
+        'edited_bytes': after_edits,
+        'list_copy_bytes': list_copy,
+    }
+
+
+def main():
+    """Run the benchmark and print a report"""
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for edits in (1, 100, 10000):
+        result = measure(line_count, edits)
+        print(f"{line_count} lines, {edits} edits after snapshot: "
+              f"snapshot {result['snapshot_time'] * 1e6:.1f}us, "
+              f"overhead {result['snapshot_bytes']} B at snapshot, "
+              f"{result['edited_bytes'] / 1024:.0f} KiB after edits "
+              f"(full list copy: {result['list_copy_bytes'] / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
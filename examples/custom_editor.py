@@ -1,7 +1,7 @@
 """Example of extending PyTEdit with custom functionality"""
 
 import sys
-from pytedit import Editor, TextBuffer
+from pytedit import DiffEngine, Editor, StructureIndex, TextBuffer
 
 
 class EnhancedTextBuffer(TextBuffer):
@@ -23,6 +23,11 @@ class CustomEditor(Editor):
     def __init__(self):
         # Replace standard TextBuffer with our enhanced version
         self.buffer = EnhancedTextBuffer()
+        self.diff = DiffEngine(self.buffer)
+        self.structure = StructureIndex(self.buffer)
+        self.segments = []
+        self.top = 0
+        self.macro = None
         
         # Set custom status message
         self.status_message = "CustomEditor | Ctrl-L: Toggle Line Numbers"
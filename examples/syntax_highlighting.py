@@ -6,7 +6,7 @@ from prompt_toolkit.layout.containers import HSplit, Window
 from prompt_toolkit.layout.controls import BufferControl, FormattedTextControl
 from prompt_toolkit.layout.layout import Layout
 from pygments.lexers import get_lexer_for_filename, Python3Lexer
-from pytedit import Editor, TextBuffer
+from pytedit import DiffEngine, Editor, StructureIndex, TextBuffer
 
 
 class SyntaxHighlightingEditor(Editor):
@@ -15,6 +15,11 @@ class SyntaxHighlightingEditor(Editor):
     def __init__(self):
         # Initialize the text buffer
         self.buffer = TextBuffer()
+        self.diff = DiffEngine(self.buffer)
+        self.structure = StructureIndex(self.buffer)
+        self.segments = []
+        self.top = 0
+        self.macro = None
         self.status_message = "Syntax Highlighting Editor | Ctrl-S: Save | Ctrl-Q: Quit"
         self.bindings = self.create_key_bindings()
         
@@ -76,6 +81,7 @@ class SyntaxHighlightingEditor(Editor):
     def run(self, filename=None):
         """Run with syntax highlighting"""
         if filename and self.buffer.load_file(filename):
+            self.diff.set_baseline()
             self.status_message = f"Loaded {filename}"
             self.set_lexer_for_file(filename)
         
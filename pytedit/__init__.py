@@ -2,8 +2,12 @@
 PyTEdit - A lightweight terminal-based text editor library for Python
 """
 
+from .diff import DiffEngine
 from .editor import Editor
-from .text_buffer import TextBuffer
+from .line_store import LineStore
+from .macro import Macro
+from .structure import StructureIndex
+from .text_buffer import BufferSnapshot, TextBuffer
 
-__all__ = ['Editor', 'TextBuffer']
+__all__ = ['BufferSnapshot', 'DiffEngine', 'Editor', 'LineStore', 'Macro', 'StructureIndex', 'TextBuffer']
 __version__ = '0.1.0'
\ No newline at end of file
@@ -6,6 +6,8 @@ Handles command-line arguments and launches the editor.
 import sys
 import argparse
 from .editor import Editor
+from .macro import Macro
+from .text_buffer import TextBuffer
 
 
 def main():
@@ -13,6 +15,13 @@ def main():
     parser = argparse.ArgumentParser(description="PyTEdit - A lightweight terminal text editor")
     parser.add_argument('filename', nargs='?', help='File to open')
     parser.add_argument('--version', action='store_true', help='Display version information')
+    parser.add_argument('--macro', metavar='MACRO', help='Play a saved macro on the file without opening the editor')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of times to play the macro')
+    parser.add_argument('--lines', metavar='START:END', help='Play the macro once per line in a 1-based inclusive range')
+    parser.add_argument('--output', help='Where to save the result of --macro (defaults to the input file)')
+    parser.add_argument('--compress', choices=['zlib', 'lzma'],
+                        help='Compress parts of the file that go unused for a while to save memory')
+    parser.add_argument('--save-macro', metavar='MACRO', help='Save the last macro recorded in the editor to a file')
     
     args = parser.parse_args()
     
@@ -21,8 +30,57 @@ def main():
         print(f"PyTEdit version {__version__}")
         return
     
+    if args.macro:
+        sys.exit(run_macro(args))
+    
     editor = Editor()
+    editor.buffer.compression = args.compress
     editor.run(args.filename)
+    
+    if args.save_macro:
+        if editor.save_macro(args.save_macro):
+            print(f"Saved macro to {args.save_macro}")
+        else:
+            print(f"No macro saved to {args.save_macro}", file=sys.stderr)
+
+
+def run_macro(args):
+    """
+    Play a saved macro on a file without starting the editor
+    
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments
+    
+    Returns:
+        int: Process exit status
+    """
+    macro = Macro()
+    if not macro.load_file(args.macro):
+        print(f"Error loading macro {args.macro}", file=sys.stderr)
+        return 1
+    
+    buffer = TextBuffer()
+    if not args.filename or not buffer.load_file(args.filename):
+        print(f"Error loading {args.filename}", file=sys.stderr)
+        return 1
+    
+    if args.lines:
+        try:
+            start, end = (int(part) for part in args.lines.split(':'))
+        except ValueError:
+            print(f"Invalid line range {args.lines}", file=sys.stderr)
+            return 1
+        stats = macro.apply_to_lines(buffer, start - 1, end)
+    else:
+        stats = macro.apply(buffer, args.repeat)
+    
+    if not buffer.save_file(args.output):
+        print(f"Error saving {args.output or args.filename}", file=sys.stderr)
+        return 1
+    
+    print(f"{stats['operations']} operations in {stats['elapsed']:.3f}s "
+          f"({stats['ops_per_second']:.0f} ops/s)")
+    return 0
 
 
 if __name__ == "__main__":
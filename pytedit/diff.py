@@ -0,0 +1,362 @@
+"""
+Diff module for PyTEdit.
+Tracks the differences between a TextBuffer and its file on disk.
+"""
+
+from bisect import bisect_left
+
+
+# Per-line change markers
+ADDED = '+'
+CHANGED = '~'
+DELETED = '-'
+
+
+def diff_lines(a, b, max_cost=2000):
+    """
+    Compute a line diff with the linear-space Myers algorithm
+    
+    The common prefix and suffix are stripped first and only the lines in
+    between are hashed to integer ids, so small edits to huge files stay cheap.
+    
+    Args:
+        a (list): Old sequence of hashable lines
+        b (list): New sequence of hashable lines
+        max_cost (int): Edit distance after which a region is reported as
+            a single replacement instead of being searched further
+    
+    Returns:
+        list: Opcodes (tag, a0, a1, b0, b1) as in difflib.SequenceMatcher
+    """
+    if a == b:
+        return [('equal', 0, len(a), 0, len(b))] if a else []
+    
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    
+    ids = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a[prefix:len(a) - suffix]]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b[prefix:len(b) - suffix]]
+    blocks = [(prefix + a_start, prefix + b_start, length)
+              for a_start, b_start, length in _matching_blocks(a_ids, b_ids, max_cost)]
+    if prefix:
+        blocks.append((0, 0, prefix))
+    if suffix:
+        blocks.append((len(a) - suffix, len(b) - suffix, suffix))
+    return _opcodes(sorted(blocks), len(a), len(b))
+
+
+def _matching_blocks(a, b, max_cost):
+    """
+    Find matching blocks between two sequences of line ids
+    
+    Returns:
+        list: Unsorted (a_start, b_start, length) matching blocks
+    """
+    blocks = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a0, a1, b0, b1 = stack.pop()
+        # Strip the common prefix and suffix
+        start = a0
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            a0 += 1
+            b0 += 1
+        if a0 > start:
+            blocks.append((start, start - a0 + b0, a0 - start))
+        end = a1
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+        if end > a1:
+            blocks.append((a1, b1, end - a1))
+        if a0 == a1 or b0 == b1:
+            continue
+        snake = _middle_snake(a, a0, a1, b, b0, b1, max_cost)
+        if snake is None:
+            continue
+        x0, y0, x1, y1 = snake
+        if x1 > x0:
+            blocks.append((x0, y0, x1 - x0))
+        stack.append((a0, x0, b0, y0))
+        stack.append((x1, a1, y1, b1))
+    return blocks
+
+
+def _middle_snake(a, a0, a1, b, b0, b1, max_cost):
+    """
+    Find the middle snake of the shortest edit script between two ranges
+    
+    Returns:
+        tuple: Absolute (x0, y0, x1, y1) of the snake, or None if the edit
+            distance exceeds max_cost
+    """
+    n = a1 - a0
+    m = b1 - b0
+    delta = n - m
+    odd = delta & 1
+    limit = min((n + m + 1) // 2, max_cost)
+    offset = limit + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    for d in range(limit + 1):
+        # Forward search from the top left corner
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and -(d - 1) <= delta - k <= d - 1:
+                if x + backward[offset + delta - k] >= n:
+                    return a0 + x_start, b0 + y_start, a0 + x, b0 + y
+        # Backward search from the bottom right corner
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a1 - x - 1] == b[b1 - y - 1]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d:
+                if x + forward[offset + delta - k] >= n:
+                    return a1 - x, b1 - y, a1 - x_start, b1 - y_start
+    return None
+
+
+def _opcodes(blocks, a_len, b_len):
+    """
+    Convert sorted matching blocks into opcodes
+    
+    Args:
+        blocks (list): Sorted (a_start, b_start, length) matching blocks
+        a_len (int): Length of the old sequence
+        b_len (int): Length of the new sequence
+    
+    Returns:
+        list: Opcodes (tag, a0, a1, b0, b1)
+    """
+    opcodes = []
+    i = j = 0
+    for a_start, b_start, length in blocks + [(a_len, b_len, 0)]:
+        if i < a_start and j < b_start:
+            opcodes.append(('replace', i, a_start, j, b_start))
+        elif i < a_start:
+            opcodes.append(('delete', i, a_start, j, b_start))
+        elif j < b_start:
+            opcodes.append(('insert', i, a_start, j, b_start))
+        if length:
+            _append(opcodes, ('equal', a_start, a_start + length, b_start, b_start + length))
+        i, j = a_start + length, b_start + length
+    return opcodes
+
+
+def _append(opcodes, opcode):
+    """Append an opcode, merging it into the previous one if both are equal"""
+    if opcode[1] == opcode[2] and opcode[3] == opcode[4]:
+        return
+    if opcodes and opcode[0] == 'equal' and opcodes[-1][0] == 'equal':
+        previous = opcodes.pop()
+        opcode = ('equal', previous[1], opcode[2], previous[3], opcode[4])
+    opcodes.append(opcode)
+
+
+class DiffEngine:
+    """Keeps an up-to-date diff between a TextBuffer and its file on disk"""
+    
+    def __init__(self, buffer, max_cost=2000):
+        """
+        Initialize the diff engine
+        
+        Args:
+            buffer (TextBuffer): The buffer to track
+            max_cost (int): Edit distance limit passed to diff_lines
+        """
+        self.buffer = buffer
+        self.max_cost = max_cost
+        self.baseline = None  # Lines of the file on disk (list or LineStore snapshot)
+        self.opcodes = []
+        self._starts = []  # Buffer start row of each opcode
+        self._dirty = None  # Pending (start, end, line_delta) in current rows
+        buffer.add_listener(self._on_change)
+    
+    def load_baseline(self, filename=None):
+        """
+        Read the file on disk and diff the buffer against it
+        
+        If the file matches the buffer, a snapshot of the buffer is kept as
+        the baseline instead, sharing its storage. Right after loading a
+        file, set_baseline() gives the same result without reading it again.
+        
+        Args:
+            filename (str, optional): Path to the file. If None, uses the buffer's filename.
+        
+        Returns:
+            bool: True if the file was read successfully, False otherwise
+        """
+        filename = filename or self.buffer.filename
+        if not filename:
+            return False
+        try:
+            with open(filename, 'r') as f:
+                lines = f.read().splitlines() or ['']
+        except Exception as e:
+            return False
+        if self.buffer.lines == lines:
+            self.set_baseline()
+            return True
+        self._set_baseline(lines)
+        self._set_opcodes(diff_lines(self.baseline, list(self.buffer.lines), self.max_cost))
+        return True
+    
+    def set_baseline(self):
+        """Use the current buffer content as the baseline, e.g. after saving"""
+        self._set_baseline(self.buffer.lines.snapshot())
+        count = len(self.baseline)
+        self._set_opcodes([('equal', 0, count, 0, count)])
+    
+    def _set_baseline(self, lines):
+        """Store baseline lines and drop pending changes"""
+        self.baseline = lines
+        self._dirty = None
+    
+    def _set_opcodes(self, opcodes):
+        """Store opcodes and refresh derived state"""
+        self.opcodes = opcodes
+        self._starts = [opcode[3] for opcode in opcodes]
+        self.buffer.modified = any(opcode[0] != 'equal' for opcode in opcodes)
+    
+    def _on_change(self, start, old_end, new_end):
+        """
+        Buffer listener: merge an edit into the pending dirty region
+        
+        Args:
+            start (int): First row that changed
+            old_end (int): Row after the changed rows before the edit
+            new_end (int): Row after the changed rows after the edit
+        """
+        if self.baseline is None:
+            return
+        delta = new_end - old_end
+        if self._dirty is None:
+            self._dirty = (start, new_end, delta)
+            return
+        dirty_start, dirty_end, dirty_delta = self._dirty
+        if dirty_end >= old_end:
+            dirty_end += delta
+        else:
+            dirty_end = new_end
+        self._dirty = (min(dirty_start, start), dirty_end, dirty_delta + delta)
+    
+    def update(self):
+        """Re-diff the pending dirty region, if any"""
+        if self._dirty is None:
+            return
+        start, end, delta = self._dirty
+        self._dirty = None
+        old_end = end - delta
+        
+        # Split opcodes into those before, overlapping and after the dirty
+        # region. Equal runs map rows 1:1 so they can be cut at its edges.
+        before, after = [], []
+        for opcode in self.opcodes:
+            tag, a0, a1, b0, b1 = opcode
+            if tag == 'equal':
+                if b0 < start:
+                    cut = min(b1, start)
+                    _append(before, ('equal', a0, a0 + cut - b0, b0, cut))
+                if b1 > old_end:
+                    cut = max(b0, old_end)
+                    after.append(('equal', a1 - (b1 - cut), a1, cut + delta, b1 + delta))
+            elif b1 < start or (b1 == start and b0 < start):
+                before.append(opcode)
+            elif b0 > old_end:
+                after.append((tag, a0, a1, b0 + delta, b1 + delta))
+        
+        window_a0 = before[-1][2] if before else 0
+        window_b0 = before[-1][4] if before else 0
+        window_a1 = after[0][1] if after else len(self.baseline)
+        window_b1 = after[0][3] if after else len(self.buffer.lines)
+        if (window_a1 - window_a0) + (window_b1 - window_b0) > 2 * (end - start) + self.max_cost:
+            # The edit falls inside changes much larger than itself, e.g.
+            # after a bulk operation. Widen them to cover the edit rather
+            # than re-diffing the whole region on every keystroke.
+            tag = 'replace' if window_a1 > window_a0 and window_b1 > window_b0 else (
+                'delete' if window_a1 > window_a0 else 'insert')
+            window = [(tag, 0, window_a1 - window_a0, 0, window_b1 - window_b0)]
+        else:
+            window = diff_lines(self.baseline[window_a0:window_a1],
+                                self.buffer.lines[window_b0:window_b1],
+                                self.max_cost)
+        
+        opcodes = before
+        for tag, a0, a1, b0, b1 in window:
+            _append(opcodes, (tag, a0 + window_a0, a1 + window_a0, b0 + window_b0, b1 + window_b0))
+        for opcode in after:
+            _append(opcodes, opcode)
+        self._set_opcodes(opcodes)
+    
+    def get_opcodes(self):
+        """
+        Get the diff between the baseline and the buffer
+        
+        Returns:
+            list: Opcodes (tag, a0, a1, b0, b1), where a is the file on disk and b the buffer
+        """
+        self.update()
+        return self.opcodes
+    
+    def is_modified(self):
+        """
+        Check whether the buffer differs from the file on disk
+        
+        Returns:
+            bool: True if the content differs, or the buffer's modified flag when there is no baseline
+        """
+        self.update()
+        return self.buffer.modified
+    
+    def line_markers(self, start, end):
+        """
+        Get change markers for a range of buffer rows
+        
+        Args:
+            start (int): First row
+            end (int): Row after the last row
+        
+        Returns:
+            dict: Row -> ADDED, CHANGED or DELETED (deleted lines above the row) for rows with changes
+        """
+        self.update()
+        markers = {}
+        last_row = len(self.buffer.lines) - 1
+        index = max(0, bisect_left(self._starts, start) - 1)
+        while index < len(self.opcodes):
+            tag, a0, a1, b0, b1 = self.opcodes[index]
+            if b0 >= end and b0 <= last_row:
+                break
+            index += 1
+            if tag == 'delete':
+                row = min(b0, last_row)
+                if start <= row < end:
+                    markers.setdefault(row, DELETED)
+            elif tag != 'equal':
+                marker = ADDED if tag == 'insert' else CHANGED
+                for row in range(max(b0, start), min(b1, end)):
+                    markers[row] = marker
+        return markers
\ No newline at end of file
@@ -3,19 +3,64 @@ Editor module for PyTEdit.
 Main editor class that coordinates between components.
 """
 
+import asyncio
 import os
+from bisect import bisect_right
 from prompt_toolkit import Application
 from prompt_toolkit.buffer import Buffer
 from prompt_toolkit.layout.containers import HSplit, Window
 from prompt_toolkit.layout.controls import BufferControl, FormattedTextControl
 from prompt_toolkit.layout.layout import Layout
+from prompt_toolkit.layout.margins import Margin
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.application import get_app
 from prompt_toolkit.filters import Condition
 
+from .diff import DiffEngine
+from .structure import StructureIndex
 from .text_buffer import TextBuffer
 
 
+# Appended to the first line of a collapsed fold
+FOLD_MARKER = " ..."
+
+# Seconds between background passes compressing cold blocks of the buffer
+COMPRESS_INTERVAL = 60
+
+
+class ChangeMargin(Margin):
+    """Gutter showing which lines changed since the file was last saved"""
+    
+    def __init__(self, diff, get_row=None):
+        """
+        Initialize the margin
+        
+        Args:
+            diff (DiffEngine): The diff engine providing line markers
+            get_row (callable, optional): Maps a displayed line to a buffer row when folds hide lines
+        """
+        self.diff = diff
+        self.get_row = get_row or (lambda line: line)
+    
+    def get_width(self, get_ui_content):
+        return 1
+    
+    def create_margin(self, window_render_info, width, height):
+        rows = [None if line is None else self.get_row(line) for line in window_render_info.displayed_lines]
+        displayed = [row for row in rows if row is not None]
+        markers = self.diff.line_markers(min(displayed), max(displayed) + 1) if displayed else {}
+        
+        result = []
+        last_row = None
+        for row in rows:
+            # Only mark the first screen line of a wrapped line
+            if row != last_row and row in markers:
+                result.append(("class:diff", markers[row]))
+            last_row = row
+            result.append(("", "\n"))
+        return result
+
+
 class Editor:
     """Main editor class that coordinates between components"""
     
@@ -27,6 +72,11 @@ class Editor:
             custom_keys (dict, optional): Dictionary of custom key bindings
         """
         self.buffer = TextBuffer()
+        self.diff = DiffEngine(self.buffer)
+        self.structure = StructureIndex(self.buffer)
+        self.segments = []  # (first displayed line, first row, end row) of each visible run of rows
+        self.top = 0  # First buffer row on screen
+        self.macro = None  # Last recorded macro
         self.status_message = "Welcome to PyTEdit! Ctrl-S: Save | Ctrl-Q: Quit"
         self.bindings = self.create_key_bindings()
         
@@ -47,6 +97,7 @@ class Editor:
                 # Main editing area
                 Window(
                     content=BufferControl(buffer=self.text_buffer),
+                    left_margins=[ChangeMargin(self.diff, self.buffer_row)],
                     wrap_lines=True,
                 ),
                 # Status bar
@@ -82,7 +133,7 @@ class Editor:
         @kb.add('c-q')
         def _(event):
             """Quit the editor"""
-            if not self.buffer.modified:
+            if not self.diff.is_modified():
                 event.app.exit()
             else:
                 self.status_message = "Unsaved changes! Press Ctrl-Q again to quit without saving"
@@ -102,6 +153,7 @@ class Editor:
             """Save the current file"""
             if self.buffer.filename:
                 if self.buffer.save_file():
+                    self.diff.set_baseline()
                     self.status_message = f"Saved {self.buffer.filename}"
                 else:
                     self.status_message = f"Error saving {self.buffer.filename}"
@@ -116,15 +168,72 @@ class Editor:
             self.status_message = "Welcome to PyTEdit! Ctrl-S: Save | Ctrl-Q: Quit"
             self.refresh_screen()
         
+        # Macro keys
+        @kb.add('c-r')
+        def _(event):
+            """Start or stop recording a macro"""
+            if self.buffer.recording is None:
+                self.buffer.start_recording()
+                self.status_message = "Recording macro... Ctrl-R: Stop"
+            else:
+                self.macro = self.buffer.stop_recording()
+                self.status_message = f"Recorded macro ({len(self.macro)} operations) | Ctrl-E: Play"
+            self.refresh_screen()
+        
+        @kb.add('c-e')
+        def _(event):
+            """Play the last recorded macro (repeat count from Meta-digits)"""
+            if self.macro is None or self.buffer.recording is not None:
+                self.status_message = "No macro recorded"
+                self.refresh_screen()
+            else:
+                self.play_macro(self.macro, times=event.arg)
+        
+        # Structure keys
+        @kb.add('c-]')
+        def _(event):
+            """Jump to the matching bracket"""
+            row, col = self.buffer.cursor_row, self.buffer.cursor_col
+            match = self.structure.matching_bracket(row, col)
+            if match is None and col > 0:
+                match = self.structure.matching_bracket(row, col - 1)
+            if match is None:
+                self.status_message = "No matching bracket"
+            else:
+                self.buffer.set_cursor(*match)
+            self.refresh_screen()
+        
+        @kb.add('c-t')
+        def _(event):
+            """Collapse or expand the fold at the cursor"""
+            row = self.structure.toggle_fold(self.buffer.cursor_row)
+            if row is None:
+                self.status_message = "No fold here"
+            else:
+                self.buffer.set_cursor(row, self.buffer.cursor_col)
+            self.refresh_screen()
+        
+        @kb.add('c-n')
+        def _(event):
+            """Jump to the next fold"""
+            row = self.structure.next_fold(self.buffer.cursor_row)
+            if row is None:
+                self.status_message = "No more folds"
+            else:
+                self.buffer.set_cursor(row, 0)
+            self.refresh_screen()
+        
         # Navigation keys
         @kb.add('up')
         def _(event):
             self.buffer.move_cursor(rows=-1)
+            self.skip_folds(-1)
             self.refresh_screen()
         
         @kb.add('down')
         def _(event):
             self.buffer.move_cursor(rows=1)
+            self.skip_folds(1)
             self.refresh_screen()
         
         @kb.add('left')
@@ -170,6 +279,40 @@ class Editor:
         
         return kb
     
+    def play_macro(self, macro, times=1, start_row=None, end_row=None):
+        """
+        Play a macro with screen refresh suspended until it finishes
+        
+        Args:
+            macro (Macro): The macro to play
+            times (int): Number of times to apply the macro
+            start_row (int, optional): If set with end_row, apply the macro once per line in the range instead
+            end_row (int, optional): Line after the last line of the range
+        
+        Returns:
+            dict: Playback statistics from the macro
+        """
+        if start_row is not None and end_row is not None:
+            stats = macro.apply_to_lines(self.buffer, start_row, end_row)
+        else:
+            stats = macro.apply(self.buffer, times)
+        self.status_message = (f"Macro: {stats['operations']} operations in "
+                               f"{stats['elapsed']:.3f}s ({stats['ops_per_second']:.0f} ops/s)")
+        self.refresh_screen()
+        return stats
+    
+    def save_macro(self, filename):
+        """
+        Save the last recorded macro to a file
+        
+        Args:
+            filename (str): Path to save the macro
+        
+        Returns:
+            bool: True if the macro saved successfully, False otherwise
+        """
+        return self.macro is not None and self.macro.save_file(filename)
+    
     def get_status_text(self):
         """
         Get the text for the status bar
@@ -178,20 +321,143 @@ class Editor:
             str: Formatted status bar text
         """
         filename = self.buffer.filename or "[No File]"
-        modified = "*" if self.buffer.modified else ""
+        modified = "*" if self.diff.is_modified() else ""
         position = f"Line {self.buffer.cursor_row+1}, Col {self.buffer.cursor_col+1}"
         return f"{modified}{filename} | {position} | {self.status_message}"
     
+    def skip_folds(self, direction):
+        """
+        Move the cursor out of a collapsed fold after a vertical move
+        
+        The move is not recorded into macros, since it depends on which
+        folds happen to be collapsed.
+        
+        Args:
+            direction (int): 1 after moving down, -1 after moving up
+        """
+        row = self.buffer.cursor_row
+        for first, last in self.structure.hidden_ranges():
+            if first <= row <= last:
+                if direction > 0 and last + 1 < len(self.buffer.lines):
+                    target = last + 1
+                else:
+                    target = first - 1
+                self.buffer.set_cursor(target, self.buffer.cursor_col, record=False)
+                return
+    
+    def buffer_row(self, line):
+        """
+        Map a displayed line to a buffer row
+        
+        Args:
+            line (int): Line number in the displayed text
+            
+        Returns:
+            int: Row in the buffer
+        """
+        index = bisect_right(self.segments, (line, float('inf'))) - 1
+        if index < 0:
+            return self.top + line
+        first_line, first_row, end_row = self.segments[index]
+        return first_row + line - first_line
+    
+    def view_height(self):
+        """
+        Get the number of buffer rows that fit on screen
+        
+        Returns:
+            int: Terminal height minus the status bar
+        """
+        try:
+            rows = get_app().output.get_size().rows
+        except Exception:
+            rows = 24
+        return max(1, rows - 1)
+    
+    def _visible_between(self, start, end, hidden):
+        """Count the rows in start:end that are not hidden by collapsed folds"""
+        count = end - start
+        for first, last in hidden:
+            count -= max(0, min(last + 1, end) - max(first, start))
+        return count
+    
+    def scroll_to_cursor(self, hidden, height):
+        """
+        Move the first row on screen so the cursor row is visible
+        
+        Args:
+            hidden (list): Row ranges hidden by collapsed folds
+            height (int): Number of rows on screen
+        """
+        row = self.buffer.cursor_row
+        top = min(self.top, len(self.buffer.lines) - 1)
+        for first, last in hidden:
+            if first <= top <= last:
+                top = first - 1
+        if row < top:
+            top = row
+        elif self._visible_between(top, row, hidden) >= height:
+            # Find the highest top that still shows the cursor on the last line
+            low, high = top, row
+            while low < high:
+                middle = (low + high) // 2
+                if self._visible_between(middle, row, hidden) < height:
+                    high = middle
+                else:
+                    low = middle + 1
+            top = low
+            for first, last in hidden:
+                if first <= top <= last:
+                    top = last + 1
+        self.top = top
+    
     def refresh_screen(self):
-        """Update the screen content"""
-        # Update the buffer text
-        self.text_buffer.text = self.buffer.get_text()
+        """
+        Update the screen content
         
-        # Set cursor position
-        # We need to convert our row/col to a buffer position
+        Only the rows on screen are rendered, so compressed blocks of the
+        buffer are only decompressed when they scroll into view.
+        """
+        lines = self.buffer.lines
+        row = self.buffer.cursor_row
+        
+        # Expand any collapsed fold hiding the cursor
+        hidden = self.structure.hidden_ranges()
+        covering = [first for first, last in hidden if first <= row <= last]
+        while covering:
+            self.structure.collapsed.discard(covering[0] - 1)
+            hidden = self.structure.hidden_ranges()
+            covering = [first for first, last in hidden if first <= row <= last]
+        
+        height = self.view_height()
+        self.scroll_to_cursor(hidden, height)
+        
+        # Update the buffer text with the rows on screen, leaving out collapsed
+        # lines and tracking where the cursor ends up in the displayed text
+        pieces = []
+        self.segments = []
+        displayed = 0
+        offset = 0
         position = 0
-        for i in range(self.buffer.cursor_row):
-            position += len(self.buffer.lines[i]) + 1  # +1 for newline
+        start = self.top
+        for first, last in [(first, last) for first, last in hidden if last >= start] + [(len(lines), None)]:
+            end = min(first, start + height - displayed)
+            segment = lines[start:end]
+            if start <= row < end:
+                position = offset + sum(map(len, segment[:row - start])) + row - start
+            self.segments.append((displayed, start, end))
+            text = '\n'.join(segment)
+            if last is not None and end == first:
+                text += FOLD_MARKER
+            pieces.append(text)
+            displayed += len(segment)
+            offset += len(text) + 1  # +1 for newline
+            if last is None or displayed >= height:
+                break
+            start = last + 1
+        self.text_buffer.text = '\n'.join(pieces)
+        
+        # Set cursor position
         position += self.buffer.cursor_col
         
         # Get the app and update cursor position
@@ -207,8 +473,19 @@ class Editor:
             filename (str, optional): Path to a file to open
         """
         if filename and os.path.exists(filename):
-            self.buffer.load_file(filename)
+            if self.buffer.load_file(filename):
+                self.diff.set_baseline()
             self.status_message = f"Loaded {filename}"
         
         self.refresh_screen()
-        self.app.run()
+        self.app.run(pre_run=self.start_compression)
+    
+    def start_compression(self):
+        """Compress cold blocks of the buffer in the background while the editor runs"""
+        self.app.create_background_task(self._compress_periodically())
+    
+    async def _compress_periodically(self):
+        """Run TextBuffer.compress_cold every COMPRESS_INTERVAL seconds"""
+        while True:
+            await asyncio.sleep(COMPRESS_INTERVAL)
+            self.buffer.compress_cold()
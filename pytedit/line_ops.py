@@ -0,0 +1,140 @@
+"""
+Line operations module for PyTEdit.
+Bulk sort, unique, filter and reverse over runs of lines.
+"""
+
+import heapq
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Lines per sorted run written by external_sort
+RUN_SIZE = 100000
+
+
+def sort_lines(lines, reverse=False, ignore_case=False):
+    """
+    Sort lines in memory
+    
+    Args:
+        lines (iterable): Lines to sort
+        reverse (bool): Sort in descending order
+        ignore_case (bool): Compare lines case-insensitively
+    
+    Returns:
+        list: The sorted lines
+    """
+    return sorted(lines, key=str.casefold if ignore_case else None, reverse=reverse)
+
+
+def unique_lines(lines):
+    """
+    Drop repeated lines, keeping the first occurrence of each
+    
+    Args:
+        lines (iterable): Lines to deduplicate
+    
+    Returns:
+        list: The remaining lines in their original order
+    """
+    return list(dict.fromkeys(lines))
+
+
+def filter_lines(lines, pattern, invert=False):
+    """
+    Keep lines matching a regular expression
+    
+    Args:
+        lines (iterable): Lines to filter
+        pattern (str): Regular expression searched for in each line
+        invert (bool): Keep the lines that do not match instead
+    
+    Returns:
+        list: The remaining lines
+    """
+    search = re.compile(pattern).search
+    if invert:
+        return [line for line in lines if not search(line)]
+    return list(filter(search, lines))
+
+
+def reverse_lines(lines):
+    """
+    Reverse the order of lines
+    
+    Args:
+        lines (iterable): Lines to reverse
+    
+    Returns:
+        list: The lines in reverse order
+    """
+    lines = list(lines)
+    lines.reverse()
+    return lines
+
+
+def external_sort(lines, reverse=False, ignore_case=False, run_size=None, workers=None):
+    """
+    Sort lines with an external merge sort
+    
+    Lines are cut into runs of run_size lines, which worker processes sort
+    and write to temporary files as (line number, line) records. The runs
+    are then merged lazily and only the line numbers are kept, so the sorted
+    result reuses the existing string objects instead of the copies read
+    back from disk, and the sort's working memory stays bounded by a few runs.
+    
+    Args:
+        lines (sequence): Lines to sort (must not contain newlines)
+        reverse (bool): Sort in descending order
+        ignore_case (bool): Compare lines case-insensitively
+        run_size (int, optional): Number of lines per sorted run. Defaults to RUN_SIZE.
+        workers (int, optional): Number of worker processes. Defaults to the CPU count.
+    
+    Yields:
+        str: The sorted lines, as the same objects as in lines
+    """
+    run_size = run_size or RUN_SIZE
+    workers = workers or os.cpu_count() or 1
+    directory = tempfile.mkdtemp(prefix='pytedit-sort-')
+    files = []
+    try:
+        paths = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = []
+            for base in range(0, len(lines), run_size):
+                path = os.path.join(directory, f'run{len(paths) + len(pending)}')
+                run = lines[base:base + run_size]
+                pending.append(pool.submit(_sort_run, run, base, path, reverse, ignore_case))
+                # Keep only a few unsorted runs in flight at once
+                if len(pending) > workers:
+                    paths.append(pending.pop(0).result())
+            paths.extend(future.result() for future in pending)
+        
+        for path in paths:
+            files.append(open(path, 'r', encoding='utf-8', errors='surrogatepass', newline='\n'))
+        runs = [map(_read_record, f) for f in files]
+        key = (lambda record: record[1].casefold()) if ignore_case else (lambda record: record[1])
+        for index, line in heapq.merge(*runs, key=key, reverse=reverse):
+            yield lines[index]
+    finally:
+        for f in files:
+            f.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _sort_run(lines, base, path, reverse, ignore_case):
+    """Sort one run of lines and write it to a file as numbered records (runs in a worker process)"""
+    key = (lambda i: lines[i].casefold()) if ignore_case else lines.__getitem__
+    order = sorted(range(len(lines)), key=key, reverse=reverse)
+    with open(path, 'w', encoding='utf-8', errors='surrogatepass', newline='\n') as f:
+        f.writelines(f'{base + i}\t{lines[i]}\n' for i in order)
+    return path
+
+
+def _read_record(record):
+    """Split a 'number<TAB>line' record read back from a run file"""
+    index, _, line = record[:-1].partition('\t')
+    return int(index), line
\ No newline at end of file
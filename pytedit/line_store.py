@@ -0,0 +1,557 @@
+"""
+LineStore module for PyTEdit.
+List-like line storage split into copy-on-write blocks, so snapshots are cheap.
+Blocks that go untouched can be compressed in memory and decompressed on demand.
+"""
+
+import lzma
+import sys
+import threading
+import time
+import weakref
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate, chain, islice
+
+
+# Compression modules usable by CompressedBlock, by name
+CODECS = {'zlib': zlib, 'lzma': lzma}
+
+
+def _resident_size(lines):
+    """Estimate the memory held by a list of lines, in bytes"""
+    return sys.getsizeof(lines) + sum(map(sys.getsizeof, lines))
+
+
+class CompressedBlock:
+    """Block of lines held in memory as compressed UTF-8 text"""
+    
+    __slots__ = ('data', 'codec', 'count', 'size')
+    
+    def __init__(self, data, codec, count, size):
+        """
+        Initialize a compressed block
+        
+        Args:
+            data (bytes): The compressed newline-joined lines
+            codec (str): Name of the compression module in CODECS
+            count (int): Number of lines
+            size (int): Estimated resident size of the lines when decompressed
+        """
+        self.data = data
+        self.codec = codec
+        self.count = count
+        self.size = size
+    
+    @classmethod
+    def compress(cls, lines, codec='zlib'):
+        """
+        Compress a block of lines
+        
+        Args:
+            lines (list): The lines to compress
+            codec (str): Name of the compression module in CODECS
+        
+        Returns:
+            CompressedBlock: The compressed block, or None if the lines are
+                empty or contain newlines and so could not be split back apart
+        """
+        text = '\n'.join(lines)
+        if not lines or text.count('\n') != len(lines) - 1:
+            return None
+        data = CODECS[codec].compress(text.encode('utf-8', 'surrogatepass'))
+        return cls(data, codec, len(lines), _resident_size(lines))
+    
+    def __len__(self):
+        return self.count
+    
+    def decompress(self):
+        """
+        Decompress the block
+        
+        Returns:
+            list: The lines of the block
+        """
+        return CODECS[self.codec].decompress(self.data).decode('utf-8', 'surrogatepass').split('\n')
+
+
+class LineStore:
+    """
+    Sequence of lines stored as a directory of fixed-size blocks
+    
+    Supports the list operations TextBuffer uses (indexing, slicing,
+    assignment, insert, pop, iteration). snapshot() returns a read-only
+    store sharing the same directory and blocks; the live store copies the
+    directory, and each block, the first time it writes to them afterwards.
+    
+    compress_cold() compresses blocks that have gone untouched for a while.
+    They are decompressed again when read or written, and the most recently
+    read ones are kept decoded in a small LRU cache.
+    """
+    
+    BLOCK_SIZE = 1024
+    
+    # Number of decompressed blocks kept in the LRU cache
+    CACHE_BLOCKS = 16
+    
+    def __init__(self, lines=()):
+        """
+        Initialize a line store
+        
+        Args:
+            lines (iterable, optional): Initial lines
+        """
+        self._blocks = self._chunk(list(lines))
+        self._len = sum(map(len, self._blocks))
+        self._starts = None  # First row of each block, computed lazily
+        self._owned = set(map(id, self._blocks))  # Blocks safe to mutate in place
+        self._shared = False  # Directory is shared with a snapshot
+        self._frozen = False  # This store is a read-only snapshot
+        self._reset_compression()
+    
+    def _reset_compression(self):
+        """Start with an empty decompression cache and no access tracking"""
+        self._cache = OrderedDict()  # CompressedBlock -> decompressed lines, in LRU order
+        self._cache_lock = threading.Lock()  # Snapshots may be read from several threads
+        self._access = None  # id(block) -> last access time, once compress_cold is used
+        self._decompressions = 0
+        self._decompress_time = 0.0
+        self._snapshots = []  # Weak references to snapshots, which compress_cold also compresses
+    
+    @property
+    def read_only(self):
+        """True if this store is a snapshot and cannot be changed"""
+        return self._frozen
+    
+    def _chunk(self, lines):
+        """Split a list of lines into blocks of BLOCK_SIZE lines"""
+        size = self.BLOCK_SIZE
+        return [lines[i:i + size] for i in range(0, len(lines), size)]
+    
+    def __len__(self):
+        return self._len
+    
+    def __iter__(self):
+        return chain.from_iterable(map(self._lines, self._blocks))
+    
+    def __eq__(self, other):
+        if isinstance(other, LineStore):
+            if other._blocks is self._blocks:
+                return True
+            if len(other) != len(self):
+                return False
+        elif not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return list(self) == list(other)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)!r})"
+    
+    def __getstate__(self):
+        return {'blocks': self._blocks, 'frozen': self._frozen}
+    
+    def __setstate__(self, state):
+        self._blocks = state['blocks']
+        self._len = sum(map(len, self._blocks))
+        self._starts = None
+        self._owned = set() if state['frozen'] else set(map(id, self._blocks))
+        self._shared = state['frozen']
+        self._frozen = state['frozen']
+        self._reset_compression()
+    
+    def _block_starts(self):
+        """Get the first row of each block, plus the total line count"""
+        if self._starts is None:
+            starts = [0]
+            starts.extend(accumulate(map(len, self._blocks)))
+            self._starts = starts
+        return self._starts
+    
+    def _locate(self, index):
+        """
+        Find the block holding a row
+        
+        Args:
+            index (int): Row between 0 and len(self) inclusive
+        
+        Returns:
+            tuple: (block index, offset in block); len(self) maps to the end of the last block
+        """
+        starts = self._block_starts()
+        block_index = min(bisect_right(starts, index), len(self._blocks)) - 1
+        return block_index, index - starts[block_index]
+    
+    def _decompress(self, block):
+        """Decompress a block, timing it"""
+        start = time.perf_counter()
+        lines = block.decompress()
+        elapsed = time.perf_counter() - start
+        with self._cache_lock:
+            self._decompress_time += elapsed
+            self._decompressions += 1
+        return lines
+    
+    def _lines(self, block):
+        """
+        Get the lines of a block without caching them
+        
+        Used for sequential scans, which would otherwise flush the cache.
+        """
+        if block.__class__ is not CompressedBlock:
+            return block
+        lines = self._cache.get(block)
+        return self._decompress(block) if lines is None else lines
+    
+    def _read(self, block):
+        """Get the lines of a block for random access, through the LRU cache"""
+        if block.__class__ is not CompressedBlock:
+            if self._access is not None:
+                self._access[id(block)] = time.monotonic()
+            return block
+        cache = self._cache
+        with self._cache_lock:
+            lines = cache.get(block)
+            if lines is not None:
+                cache.move_to_end(block)
+                return lines
+        # Decompress outside the lock so other readers are not held up
+        lines = self._decompress(block)
+        with self._cache_lock:
+            cache[block] = lines
+            cache.move_to_end(block)
+            if len(cache) > self.CACHE_BLOCKS:
+                cache.popitem(last=False)
+        return lines
+    
+    def _index(self, index):
+        """Normalize a row index, raising IndexError when out of range"""
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("line index out of range")
+        return index
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            if start >= stop:
+                return []
+            block_index, offset = self._locate(start)
+            end_index = self._locate(stop - 1)[0] + 1
+            # Short ranges (a screenful) go through the cache, long scans do not
+            read = self._read if end_index - block_index <= self.CACHE_BLOCKS else self._lines
+            lines = chain.from_iterable(map(read, islice(self._blocks, block_index, end_index)))
+            return list(islice(lines, offset, offset + stop - start))
+        block_index, offset = self._locate(self._index(index))
+        return self._read(self._blocks[block_index])[offset]
+    
+    def __setitem__(self, index, line):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                raise ValueError("extended slice assignment is not supported")
+            self.replace(start, max(start, stop), line)
+            return
+        block_index, offset = self._locate(self._index(index))
+        self._writable_block(block_index)[offset] = line
+    
+    def _writable_directory(self):
+        """Get the block directory, copying it first if a snapshot shares it"""
+        if self._frozen:
+            raise TypeError("snapshot is read-only")
+        if self._shared:
+            self._blocks = list(self._blocks)
+            self._shared = False
+        return self._blocks
+    
+    def _writable_block(self, block_index):
+        """Get a block for in-place mutation, copying it first if a snapshot shares it"""
+        blocks = self._writable_directory()
+        block = blocks[block_index]
+        if block.__class__ is CompressedBlock:
+            with self._cache_lock:
+                lines = self._cache.pop(block, None)
+            block = self._decompress(block) if lines is None else lines
+            blocks[block_index] = block
+            self._owned.add(id(block))
+        elif id(block) not in self._owned:
+            block = list(block)
+            blocks[block_index] = block
+            self._owned.add(id(block))
+        if self._access is not None:
+            self._access[id(block)] = time.monotonic()
+        return block
+    
+    def insert(self, index, line):
+        """
+        Insert a line before a row, like list.insert
+        
+        Args:
+            index (int): Row to insert before
+            line (str): The line to insert
+        """
+        if index < 0:
+            index = max(0, index + self._len)
+        index = min(index, self._len)
+        if not self._blocks:
+            self.replace(0, 0, [line])
+            return
+        block_index, offset = self._locate(index)
+        block = self._writable_block(block_index)
+        block.insert(offset, line)
+        self._len += 1
+        self._starts = None
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self._split(block_index)
+    
+    def append(self, line):
+        """
+        Append a line at the end
+        
+        Args:
+            line (str): The line to append
+        """
+        self.insert(self._len, line)
+    
+    def pop(self, index=-1):
+        """
+        Remove and return a line, like list.pop
+        
+        Args:
+            index (int): Row to remove
+        
+        Returns:
+            str: The removed line
+        """
+        block_index, offset = self._locate(self._index(index))
+        block = self._writable_block(block_index)
+        line = block.pop(offset)
+        self._len -= 1
+        self._starts = None
+        if len(block) < self.BLOCK_SIZE // 4:
+            self._merge(block_index)
+        return line
+    
+    def _split(self, block_index):
+        """Split an oversized block in half"""
+        blocks = self._writable_directory()
+        block = blocks[block_index]
+        self._owned.discard(id(block))
+        half = len(block) // 2
+        pieces = [block[:half], block[half:]]
+        blocks[block_index:block_index + 1] = pieces
+        self._owned.update(map(id, pieces))
+    
+    def _merge(self, block_index):
+        """Merge an undersized block into a neighbour, or drop it if empty"""
+        blocks = self._writable_directory()
+        block = blocks[block_index]
+        if not block:
+            self._owned.discard(id(blocks.pop(block_index)))
+            return
+        for neighbour in (block_index + 1, block_index - 1):
+            if 0 <= neighbour < len(blocks) and len(blocks[neighbour]) + len(block) <= self.BLOCK_SIZE:
+                first = min(block_index, neighbour)
+                merged = self._read(blocks[first]) + self._read(blocks[first + 1])
+                self._owned.discard(id(blocks[first]))
+                self._owned.discard(id(blocks[first + 1]))
+                blocks[first:first + 2] = [merged]
+                self._owned.add(id(merged))
+                return
+    
+    def replace(self, start, stop, lines):
+        """
+        Replace rows start:stop with new lines in one operation
+        
+        Only the blocks overlapping the range are rebuilt.
+        
+        Args:
+            start (int): First row to replace
+            stop (int): Row after the last row to replace
+            lines (iterable): The replacement lines
+        """
+        lines = list(lines)
+        blocks = self._writable_directory()
+        if not blocks:
+            first = last = 0
+            middle = lines
+        else:
+            first, first_offset = self._locate(start)
+            last, last_offset = self._locate(stop)
+            if last_offset == 0 and last > first:
+                last -= 1
+                last_offset = len(blocks[last])
+            middle = self._read(blocks[first])[:first_offset] + lines + self._read(blocks[last])[last_offset:]
+        new_blocks = self._chunk(middle)
+        for block in blocks[first:last + 1]:
+            self._owned.discard(id(block))
+        blocks[first:last + 1] = new_blocks
+        self._owned.update(map(id, new_blocks))
+        self._len += len(lines) - (stop - start)
+        self._starts = None
+    
+    def copy(self):
+        """
+        Copy the store in O(1)
+        
+        The copy shares all storage with this store; whichever of them
+        writes to a block first copies it.
+        
+        Returns:
+            LineStore: A writable store with the same lines
+        """
+        store = self.__class__.__new__(self.__class__)
+        store._blocks = self._blocks
+        store._len = self._len
+        store._starts = self._starts
+        store._owned = set()
+        store._shared = True
+        store._frozen = False
+        store._reset_compression()
+        if not self._frozen:
+            self._shared = True
+            self._owned = set()
+        return store
+    
+    def snapshot(self):
+        """
+        Take a read-only snapshot of the store in O(1)
+        
+        The snapshot shares all storage with this store. It is safe to read
+        from other threads, and can be pickled to other processes, while this
+        store keeps changing.
+        
+        Returns:
+            LineStore: A read-only store with the current lines
+        """
+        if self._frozen:
+            return self
+        snapshot = self.copy()
+        snapshot._frozen = True
+        self._snapshots = [ref for ref in self._snapshots if ref() is not None]
+        self._snapshots.append(weakref.ref(snapshot))
+        return snapshot
+    
+    def _live_snapshots(self):
+        """Get the snapshots of this store that are still alive"""
+        return [snapshot for snapshot in (ref() for ref in self._snapshots) if snapshot is not None]
+    
+    def compress_cold(self, codec='zlib', idle=0):
+        """
+        Compress blocks that have not been accessed for a while
+        
+        Compression does not change the content, so a compressed block is
+        swapped in place into every directory holding the original, including
+        directories shared with snapshots; readers handle both kinds of block.
+        Blocks that only snapshots still hold are not used by this store and
+        are compressed too. The first call starts tracking accesses, and
+        blocks not seen before count as accessed at the time of the call.
+        
+        Args:
+            codec (str): Name of the compression module in CODECS ('zlib' or 'lzma')
+            idle (float): Seconds a block must have gone unaccessed to be compressed
+        
+        Returns:
+            int: Number of blocks compressed
+        
+        Raises:
+            ValueError: If the codec is unknown
+            TypeError: If the store is a read-only snapshot
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        if self._frozen:
+            raise TypeError("snapshot is read-only")
+        now = time.monotonic()
+        access = self._access or {}
+        recent = {}
+        packed = {}  # id(block) -> (block, compressed block), keeping ids valid
+        
+        blocks = self._blocks
+        for block_index, block in enumerate(blocks):
+            if block.__class__ is CompressedBlock:
+                continue
+            last = access.get(id(block), now)
+            if now - last < idle:
+                recent[id(block)] = last
+                continue
+            compressed = CompressedBlock.compress(block, codec)
+            if compressed is not None:
+                packed[id(block)] = (block, compressed)
+                blocks[block_index] = compressed
+                self._owned.discard(id(block))
+        self._access = recent
+        
+        seen = {id(blocks)}
+        for snapshot in self._live_snapshots():
+            directory = snapshot._blocks
+            if id(directory) in seen:
+                continue
+            seen.add(id(directory))
+            for block_index, block in enumerate(directory):
+                if block.__class__ is CompressedBlock or id(block) in recent:
+                    continue
+                if id(block) not in packed:
+                    compressed = CompressedBlock.compress(block, codec)
+                    if compressed is None:
+                        continue
+                    packed[id(block)] = (block, compressed)
+                directory[block_index] = packed[id(block)][1]
+        return len(packed)
+    
+    def compression_stats(self, *others):
+        """
+        Report memory use and decompression cost of compressed blocks
+        
+        Blocks held by this store's live snapshots are included, so blocks
+        kept decoded by a snapshot show up as resident. Each block is counted
+        once. Sizes are estimates from sys.getsizeof, and a string shared by
+        several blocks is counted once per block.
+        
+        Args:
+            *others (LineStore): Further stores to include, e.g. undo history
+        
+        Returns:
+            dict: Block counts, 'resident_bytes' (estimated memory now),
+                'uncompressed_bytes' (estimated memory with every block
+                decoded), 'compressed_bytes', 'decompressions' and
+                'decompress_latency' (mean seconds per decompression)
+        """
+        stores = [self, *self._live_snapshots(), *others]
+        blocks = {}
+        cached = {}
+        decompressions = 0
+        decompress_time = 0.0
+        for store in stores:
+            blocks.update((id(block), block) for block in store._blocks)
+            with store._cache_lock:
+                cached.update((id(lines), lines) for lines in store._cache.values())
+            decompressions += store._decompressions
+            decompress_time += store._decompress_time
+        
+        resident = uncompressed = packed = compressed_blocks = 0
+        for block in blocks.values():
+            if block.__class__ is CompressedBlock:
+                compressed_blocks += 1
+                packed += len(block.data)
+                uncompressed += block.size
+            else:
+                size = _resident_size(block)
+                resident += size
+                uncompressed += size
+        resident += packed + sum(map(_resident_size, cached.values()))
+        return {
+            'blocks': len(blocks),
+            'compressed_blocks': compressed_blocks,
+            'cached_blocks': len(cached),
+            'resident_bytes': resident,
+            'uncompressed_bytes': uncompressed,
+            'compressed_bytes': packed,
+            'decompressions': decompressions,
+            'decompress_latency': decompress_time / decompressions if decompressions else 0.0,
+        }
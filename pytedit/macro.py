@@ -0,0 +1,181 @@
+"""
+Macro module for PyTEdit.
+Records TextBuffer operations and replays them in batches.
+"""
+
+import json
+import time
+
+
+class Macro:
+    """A recorded sequence of TextBuffer operations"""
+    
+    # Buffer methods that may be recorded and replayed, with their argument types
+    OPERATIONS = {
+        'insert_char': (str,),
+        'insert_text': (str,),
+        'insert_newline': (),
+        'backspace': (),
+        'delete': (),
+        'move_cursor': (int, int),
+        'jump_cursor': (int, int),
+    }
+    
+    def __init__(self, operations=None):
+        """
+        Initialize a macro
+        
+        Args:
+            operations (list, optional): List of (operation, args) pairs
+        """
+        self.operations = []
+        for operation, args in operations or []:
+            self.add(operation, *args)
+    
+    def __len__(self):
+        return len(self.operations)
+    
+    def add(self, operation, *args):
+        """
+        Append an operation to the macro
+        
+        Args:
+            operation (str): Name of a TextBuffer method in OPERATIONS
+            *args: Arguments passed to the method on playback
+        
+        Raises:
+            ValueError: If the operation is unknown or its arguments are invalid
+        """
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Unknown macro operation: {operation}")
+        types = self.OPERATIONS[operation]
+        if len(args) != len(types) or not all(
+                type(arg) is arg_type for arg, arg_type in zip(args, types)):
+            raise ValueError(f"Invalid arguments for {operation}: {args!r}")
+        if any(isinstance(arg, str) and ('\n' in arg or '\r' in arg) for arg in args):
+            raise ValueError(f"Macro text cannot contain newlines: {args!r}")
+        if operation == 'insert_char' and len(args[0]) != 1:
+            raise ValueError(f"insert_char takes a single character: {args!r}")
+        self.operations.append((operation, tuple(args)))
+    
+    def compile(self):
+        """
+        Merge runs of character inserts into single text inserts
+        
+        Returns:
+            list: Compiled list of (operation, args) pairs
+        """
+        compiled = []
+        for operation, args in self.operations:
+            if operation == 'insert_char':
+                operation, args = 'insert_text', args
+            if (operation == 'insert_text' and compiled
+                    and compiled[-1][0] == 'insert_text'):
+                compiled[-1] = ('insert_text', (compiled[-1][1][0] + args[0],))
+            else:
+                compiled.append((operation, args))
+        return compiled
+    
+    def apply(self, buffer, times=1):
+        """
+        Apply the macro to a buffer a number of times
+        
+        Args:
+            buffer (TextBuffer): The buffer to edit
+            times (int): Number of times to apply the macro
+        
+        Returns:
+            dict: Playback statistics (see _stats)
+        """
+        start = time.perf_counter()
+        steps = [(getattr(buffer, operation), args) for operation, args in self.compile()]
+        for _ in range(times):
+            for method, args in steps:
+                method(*args)
+        return self._stats(times, start)
+    
+    def apply_to_lines(self, buffer, start_row, end_row):
+        """
+        Apply the macro once at the start of each line in a range
+        
+        Rows refer to the buffer before playback; lines added or removed
+        by the macro are accounted for as playback moves down the range.
+        
+        Args:
+            buffer (TextBuffer): The buffer to edit
+            start_row (int): First line to apply the macro on
+            end_row (int): Line after the last line to apply the macro on
+        
+        Returns:
+            dict: Playback statistics (see _stats)
+        """
+        start = time.perf_counter()
+        steps = [(getattr(buffer, operation), args) for operation, args in self.compile()]
+        start_row = max(0, start_row)
+        end_row = min(len(buffer.lines), end_row)
+        offset = 0
+        for row in range(start_row, end_row):
+            line_count = len(buffer.lines)
+            buffer.cursor_row = min(row + offset, line_count - 1)
+            buffer.cursor_col = 0
+            for method, args in steps:
+                method(*args)
+            offset += len(buffer.lines) - line_count
+        return self._stats(max(0, end_row - start_row), start)
+    
+    def _stats(self, runs, start):
+        """
+        Build playback statistics
+        
+        Args:
+            runs (int): Number of times the macro was applied
+            start (float): perf_counter value when playback started
+        
+        Returns:
+            dict: Runs, operations applied, elapsed seconds and operations per second
+        """
+        elapsed = time.perf_counter() - start
+        operations = runs * len(self.operations)
+        return {
+            'runs': runs,
+            'operations': operations,
+            'elapsed': elapsed,
+            'ops_per_second': operations / elapsed if elapsed > 0 else float('inf'),
+        }
+    
+    def load_file(self, filename):
+        """
+        Load a macro from a JSON file
+        
+        Args:
+            filename (str): Path to the macro file
+        
+        Returns:
+            bool: True if the macro loaded successfully, False otherwise
+        """
+        try:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+            operations = Macro([(operation, args) for operation, args in data['operations']]).operations
+        except Exception as e:
+            return False
+        self.operations = operations
+        return True
+    
+    def save_file(self, filename):
+        """
+        Save the macro to a JSON file
+        
+        Args:
+            filename (str): Path to save the macro
+        
+        Returns:
+            bool: True if the macro saved successfully, False otherwise
+        """
+        data = {'operations': [[operation, list(args)] for operation, args in self.operations]}
+        try:
+            with open(filename, 'w') as f:
+                json.dump(data, f)
+            return True
+        except Exception as e:
+            return False
\ No newline at end of file
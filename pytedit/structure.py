@@ -0,0 +1,652 @@
+"""
+Structure module for PyTEdit.
+Incremental index of brackets, indentation and fold regions.
+"""
+
+import re
+
+
+OPENERS = '([{'
+CLOSERS = ')]}'
+
+_BRACKETS = re.compile(r'[()\[\]{}]')
+_TOKENS = re.compile(r'[()\[\]{}"\'\\]')
+_BLANK = float('inf')  # Indent used for blank lines in summaries
+# Summary of a run of lines: (lines, unmatched closers, unmatched openers, fold starts, min indent)
+_EMPTY = (0, 0, 0, 0, _BLANK)
+_INFOS = {}  # Shared line_info results
+
+
+def scan_line(line):
+    """
+    Find the indentation and brackets of a line
+    
+    Brackets inside single- or double-quoted strings are ignored. A quote
+    that is not closed later on the same line, such as an apostrophe in a
+    comment or a Rust lifetime, is treated as a plain character.
+    
+    Args:
+        line (str): The line to scan
+    
+    Returns:
+        tuple: (indent, tokens, closes, opens) where indent is -1 for blank
+            lines, tokens is a tuple of (col, bracket) pairs and closes/opens
+            count the brackets left unmatched within the line
+    """
+    stripped = line.lstrip()
+    indent = len(line) - len(stripped) if stripped else -1
+    if '"' in line or "'" in line:
+        tokens = []
+        matches = [(match.start(), match.group()) for match in _TOKENS.finditer(line)]
+        unclosed = set()  # Quotes with no closing quote after them
+        index = 0
+        while index < len(matches):
+            col, char = matches[index]
+            index += 1
+            if char in '"\'':
+                if char not in unclosed:
+                    end = _string_end(matches, index, char)
+                    if end is None:
+                        unclosed.add(char)
+                    else:
+                        index = end
+            elif char != '\\':
+                tokens.append((col, char))
+    else:
+        tokens = [(match.start(), match.group()) for match in _BRACKETS.finditer(line)]
+    
+    closes = opens = 0
+    for col, char in tokens:
+        if char in OPENERS:
+            opens += 1
+        elif opens:
+            opens -= 1
+        else:
+            closes += 1
+    return indent, tuple(tokens), closes, opens
+
+
+def _string_end(matches, index, quote):
+    """
+    Find the closing quote of a string
+    
+    Args:
+        matches (list): (col, char) tokens of the line
+        index (int): Index of the token after the opening quote
+        quote (str): The opening quote character
+    
+    Returns:
+        int: Index of the token after the closing quote, or None if the string is not closed
+    """
+    escaped_col = -1
+    for end in range(index, len(matches)):
+        col, char = matches[end]
+        if col == escaped_col:
+            continue
+        if char == '\\':
+            escaped_col = col + 1
+        elif char == quote:
+            return end + 1
+    return None
+
+
+def line_info(line):
+    """
+    Summarize a line for the index
+    
+    Args:
+        line (str): The line to summarize
+        
+    Returns:
+        tuple: (indent, closes, opens) as in scan_line; equal summaries are shared
+    """
+    if '"' in line or "'" in line:
+        indent, tokens, closes, opens = scan_line(line)
+    else:
+        stripped = line.lstrip()
+        indent = len(line) - len(stripped) if stripped else -1
+        closes = opens = 0
+        for char in _BRACKETS.findall(line):
+            if char in OPENERS:
+                opens += 1
+            elif opens:
+                opens -= 1
+            else:
+                closes += 1
+    info = (indent, closes, opens)
+    return _INFOS.setdefault(info, info)
+
+
+def _combine(left, right):
+    """Combine the summaries of two adjacent runs of lines"""
+    matched = min(left[2], right[1])
+    return (left[0] + right[0],
+            left[1] + right[1] - matched,
+            left[2] - matched + right[2],
+            left[3] + right[3],
+            min(left[4], right[4]))
+
+
+def _line_summary(info, fold):
+    """Summary of a single line"""
+    return (1, info[1], info[2], 1 if fold else 0, info[0] if info[0] >= 0 else _BLANK)
+
+
+def _fold_flags(infos, next_indent):
+    """
+    Work out which lines start a fold
+    
+    A non-blank line starts a fold when the next non-blank line is indented further.
+    
+    Args:
+        infos (list): Line infos from line_info
+        next_indent (int): Indent of the first non-blank line after infos, or -1
+    
+    Returns:
+        list: One bool per line
+    """
+    flags = [False] * len(infos)
+    for i in range(len(infos) - 1, -1, -1):
+        indent = infos[i][0]
+        if indent >= 0:
+            flags[i] = next_indent > indent
+            next_indent = indent
+    return flags
+
+
+class _Chunk:
+    """A run of consecutive lines with their combined summary"""
+    
+    def __init__(self, infos, folds):
+        self.infos = infos
+        self.folds = folds
+        self.summarize()
+    
+    def summarize(self):
+        """Recompute the summary of the chunk"""
+        closes = opens = 0
+        min_indent = _BLANK
+        for indent, line_closes, line_opens in self.infos:
+            matched = min(opens, line_closes)
+            closes += line_closes - matched
+            opens += line_opens - matched
+            if 0 <= indent < min_indent:
+                min_indent = indent
+        self.summary = (len(self.infos), closes, opens, sum(self.folds), min_indent)
+
+
+class StructureIndex:
+    """
+    Tracks bracket pairs, indentation and fold regions of a TextBuffer
+    
+    Lines are grouped into chunks whose summaries sit in a segment tree, so
+    an edit only rescans the changed lines and queries walk O(log n) tree
+    nodes plus at most two chunks. The buffer is first scanned on the first
+    query, so opening a large file does not pay for it up front.
+    """
+    
+    CHUNK_SIZE = 128
+    
+    def __init__(self, buffer):
+        """
+        Initialize the index
+        
+        Args:
+            buffer (TextBuffer): The buffer to index
+        """
+        self.buffer = buffer
+        self.collapsed = set()  # Fold start rows collapsed in the editor
+        self._chunks = []
+        self._size = 1
+        self._tree = [_EMPTY, _EMPTY]
+        self._built = False
+        buffer.add_listener(self._on_change)
+    
+    def __len__(self):
+        self._ensure_built()
+        return self._tree[1][0]
+    
+    def rebuild(self):
+        """Rescan the whole buffer"""
+        infos = [line_info(line) for line in self.buffer.lines]
+        self._chunks = self._chunk(infos, _fold_flags(infos, -1))
+        self._build_tree()
+        self._built = True
+    
+    def _ensure_built(self):
+        """Scan the buffer if it has not been scanned yet"""
+        if not self._built:
+            self.rebuild()
+    
+    def _chunk(self, infos, folds):
+        """Split line infos and fold flags into chunks"""
+        size = self.CHUNK_SIZE
+        return [_Chunk(infos[i:i + size], folds[i:i + size]) for i in range(0, len(infos), size)]
+    
+    def _build_tree(self):
+        """Rebuild the segment tree over chunk summaries"""
+        size = 1
+        while size < len(self._chunks):
+            size *= 2
+        tree = [_EMPTY] * (2 * size)
+        for i, chunk in enumerate(self._chunks):
+            tree[size + i] = chunk.summary
+        for node in range(size - 1, 0, -1):
+            tree[node] = _combine(tree[2 * node], tree[2 * node + 1])
+        self._size = size
+        self._tree = tree
+    
+    def _update_chunk(self, chunk_index):
+        """Recompute a chunk summary and its path to the tree root"""
+        chunk = self._chunks[chunk_index]
+        chunk.summarize()
+        tree = self._tree
+        node = chunk_index + self._size
+        tree[node] = chunk.summary
+        node //= 2
+        while node:
+            tree[node] = _combine(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+    
+    def _locate(self, row):
+        """
+        Find the chunk holding a row
+        
+        Args:
+            row (int): Row between 0 and len(self) inclusive
+        
+        Returns:
+            tuple: (chunk index, offset in chunk); len(self) maps to the end of the last chunk
+        """
+        if row >= len(self):
+            return len(self._chunks) - 1, len(self._chunks[-1].infos)
+        tree = self._tree
+        node = 1
+        while node < self._size:
+            left = 2 * node
+            if row < tree[left][0]:
+                node = left
+            else:
+                row -= tree[left][0]
+                node = left + 1
+        return node - self._size, row
+    
+    def _chunk_start(self, chunk_index):
+        """Get the first row of a chunk"""
+        tree = self._tree
+        node = chunk_index + self._size
+        row = 0
+        while node > 1:
+            if node & 1:
+                row += tree[node - 1][0]
+            node //= 2
+        return row
+    
+    def _info(self, row):
+        """Get the line_info and fold flag of a row"""
+        chunk_index, offset = self._locate(row)
+        chunk = self._chunks[chunk_index]
+        return chunk.infos[offset], chunk.folds[offset]
+    
+    def _on_change(self, start, old_end, new_end):
+        """
+        Buffer listener: rescan the changed lines
+        
+        Args:
+            start (int): First row that changed
+            old_end (int): Row after the changed rows before the edit
+            new_end (int): Row after the changed rows after the edit
+        """
+        if not self._built:
+            return
+        infos = [line_info(line) for line in self.buffer.lines[start:new_end]]
+        self._splice(start, old_end, infos)
+        self._refresh_folds(start, new_end)
+        
+        delta = new_end - old_end
+        if delta:
+            self.collapsed = {row if row < start else row + delta
+                              for row in self.collapsed if row < start or row >= old_end}
+    
+    def _splice(self, start, old_end, infos):
+        """Replace the infos of rows start:old_end"""
+        if not self._chunks:
+            self._chunks = self._chunk(infos, [False] * len(infos))
+            self._build_tree()
+            return
+        first, first_offset = self._locate(start)
+        last, last_offset = self._locate(old_end)
+        if last_offset == 0 and last > first:
+            last -= 1
+            last_offset = len(self._chunks[last].infos)
+        first_chunk = self._chunks[first]
+        last_chunk = self._chunks[last]
+        middle_infos = first_chunk.infos[:first_offset] + infos + last_chunk.infos[last_offset:]
+        middle_folds = first_chunk.folds[:first_offset] + [False] * len(infos) + last_chunk.folds[last_offset:]
+        if first == last and 0 < len(middle_infos) <= 2 * self.CHUNK_SIZE:
+            self._chunks[first] = _Chunk(middle_infos, middle_folds)
+            self._update_chunk(first)
+        else:
+            self._chunks[first:last + 1] = self._chunk(middle_infos, middle_folds)
+            self._build_tree()
+    
+    def _refresh_folds(self, start, end):
+        """Recompute fold flags of rows start:end and the non-blank row before them"""
+        begin, _ = self._search_left(start - 1, _nonblank)
+        if begin is None:
+            begin = start
+        following, _ = self._search_right(end, _nonblank)
+        next_indent = self._info(following)[0][0] if following is not None else -1
+        if end <= begin:
+            return
+        
+        chunk_index, offset = self._locate(end - 1)
+        row = end - 1
+        while row >= begin:
+            chunk = self._chunks[chunk_index]
+            changed = False
+            while offset >= 0 and row >= begin:
+                indent = chunk.infos[offset][0]
+                fold = indent >= 0 and next_indent > indent
+                if chunk.folds[offset] != fold:
+                    chunk.folds[offset] = fold
+                    changed = True
+                if indent >= 0:
+                    next_indent = indent
+                offset -= 1
+                row -= 1
+            if changed:
+                self._update_chunk(chunk_index)
+            chunk_index -= 1
+            if chunk_index >= 0:
+                offset = len(self._chunks[chunk_index].infos) - 1
+    
+    def _nodes(self, lo, hi):
+        """Get tree nodes covering chunks lo:hi, in left-to-right order"""
+        left, right = [], []
+        lo += self._size
+        hi += self._size
+        while lo < hi:
+            if lo & 1:
+                left.append(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right.append(hi)
+            lo //= 2
+            hi //= 2
+        return left + right[::-1]
+    
+    def _search_right(self, row, test, state=None):
+        """
+        Find the first row at or after row whose summary passes a test
+        
+        Args:
+            row (int): Row to start from
+            test (callable): test(summary, state) -> (hit, state after the summary)
+            state: Initial search state
+        
+        Returns:
+            tuple: (row or None, state before the hit row)
+        """
+        if row < 0:
+            row = 0
+        if row >= len(self):
+            return None, state
+        chunk_index, offset = self._locate(row)
+        found, state = self._scan_chunk(chunk_index, offset, row, 1, test, state)
+        if found is not None:
+            return found, state
+        tree = self._tree
+        for node in self._nodes(chunk_index + 1, len(self._chunks)):
+            hit, advanced = test(tree[node], state)
+            if not hit:
+                state = advanced
+                continue
+            while node < self._size:
+                hit, advanced = test(tree[2 * node], state)
+                if hit:
+                    node = 2 * node
+                else:
+                    state = advanced
+                    node = 2 * node + 1
+            chunk_index = node - self._size
+            return self._scan_chunk(chunk_index, 0, self._chunk_start(chunk_index), 1, test, state)
+        return None, state
+    
+    def _search_left(self, row, test, state=None):
+        """
+        Find the last row at or before row whose summary passes a test
+        
+        Args:
+            row (int): Row to start from
+            test (callable): test(summary, state) -> (hit, state after the summary)
+            state: Initial search state
+        
+        Returns:
+            tuple: (row or None, state before the hit row)
+        """
+        if row >= len(self):
+            row = len(self) - 1
+        if row < 0:
+            return None, state
+        chunk_index, offset = self._locate(row)
+        found, state = self._scan_chunk(chunk_index, offset, row, -1, test, state)
+        if found is not None:
+            return found, state
+        tree = self._tree
+        for node in reversed(self._nodes(0, chunk_index)):
+            hit, advanced = test(tree[node], state)
+            if not hit:
+                state = advanced
+                continue
+            while node < self._size:
+                hit, advanced = test(tree[2 * node + 1], state)
+                if hit:
+                    node = 2 * node + 1
+                else:
+                    state = advanced
+                    node = 2 * node
+            chunk_index = node - self._size
+            chunk = self._chunks[chunk_index]
+            last = len(chunk.infos) - 1
+            return self._scan_chunk(chunk_index, last, self._chunk_start(chunk_index) + last, -1, test, state)
+        return None, state
+    
+    def _scan_chunk(self, chunk_index, offset, row, step, test, state):
+        """Test lines of one chunk from offset in direction step"""
+        chunk = self._chunks[chunk_index]
+        end = len(chunk.infos) if step > 0 else -1
+        for i in range(offset, end, step):
+            hit, advanced = test(_line_summary(chunk.infos[i], chunk.folds[i]), state)
+            if hit:
+                return row, state
+            state = advanced
+            row += step
+        return None, state
+    
+    def matching_bracket(self, row, col):
+        """
+        Find the bracket matching the one at a position
+        
+        Args:
+            row (int): Row of the bracket
+            col (int): Column of the bracket
+        
+        Returns:
+            tuple: (row, col) of the matching bracket, or None
+        """
+        self._ensure_built()
+        if not 0 <= row < len(self):
+            return None
+        tokens = scan_line(self.buffer.lines[row])[1]
+        index = next((i for i, token in enumerate(tokens) if token[0] == col), None)
+        if index is None:
+            return None
+        
+        if tokens[index][1] in OPENERS:
+            depth = 0
+            for token_col, char in tokens[index:]:
+                depth += 1 if char in OPENERS else -1
+                if depth == 0:
+                    return row, token_col
+            found, need = self._search_right(row + 1, _match_closer, depth)
+            if found is None:
+                return None
+            return found, _unmatched_col(scan_line(self.buffer.lines[found])[1], need, CLOSERS)
+        
+        depth = 0
+        for token_col, char in reversed(tokens[:index + 1]):
+            depth += 1 if char in CLOSERS else -1
+            if depth == 0:
+                return row, token_col
+        found, need = self._search_left(row - 1, _match_opener, depth)
+        if found is None:
+            return None
+        return found, _unmatched_col(scan_line(self.buffer.lines[found])[1][::-1], need, OPENERS)
+    
+    def block_end(self, row):
+        """
+        Find the last line of the indentation block started by a row
+        
+        Args:
+            row (int): First row of the block
+        
+        Returns:
+            int: Last non-blank row indented further than row, or row itself
+        """
+        self._ensure_built()
+        indent = self._info(row)[0][0]
+        following, _ = self._search_right(row + 1, lambda summary, state: (summary[4] <= indent, state))
+        if following is None:
+            following = len(self)
+        end, _ = self._search_left(following - 1, _nonblank)
+        return max(row, end if end is not None else row)
+    
+    def enclosing_block(self, row):
+        """
+        Find the indentation block enclosing a row
+        
+        Args:
+            row (int): Row inside the block
+        
+        Returns:
+            tuple: (first row, last row) of the block, or None at the top level
+        """
+        self._ensure_built()
+        if not 0 <= row < len(self):
+            return None
+        found, _ = self._search_right(row, _nonblank)
+        if found is None:
+            return None
+        indent = self._info(found)[0][0]
+        start, _ = self._search_left(row - 1, lambda summary, state: (summary[4] < indent, state))
+        if start is None:
+            return None
+        return start, self.block_end(start)
+    
+    def fold_region(self, row):
+        """
+        Get the fold region starting at a row
+        
+        Args:
+            row (int): Row to check
+        
+        Returns:
+            tuple: (first row, last row) of the fold, or None if no fold starts at row
+        """
+        self._ensure_built()
+        if not 0 <= row < len(self) or not self._info(row)[1]:
+            return None
+        return row, self.block_end(row)
+    
+    def next_fold(self, row):
+        """
+        Find the next fold start after a row
+        
+        Args:
+            row (int): Row to search after
+        
+        Returns:
+            int: Row of the next fold start, or None
+        """
+        self._ensure_built()
+        found, _ = self._search_right(row + 1, lambda summary, state: (summary[3] > 0, state))
+        return found
+    
+    def toggle_fold(self, row):
+        """
+        Collapse or expand the fold at or around a row
+        
+        Args:
+            row (int): Row of a fold start, or a row inside a block
+        
+        Returns:
+            int: Start row of the toggled fold, or None if there is no fold
+        """
+        if self.fold_region(row) is None:
+            block = self.enclosing_block(row)
+            if block is None:
+                return None
+            row = block[0]
+        if row in self.collapsed:
+            self.collapsed.discard(row)
+        else:
+            self.collapsed.add(row)
+        return row
+    
+    def hidden_ranges(self):
+        """
+        Get the row ranges hidden by collapsed folds
+        
+        Returns:
+            list: Sorted, non-overlapping (first row, last row) ranges
+        """
+        ranges = []
+        for row in sorted(self.collapsed):
+            if ranges and row <= ranges[-1][1]:
+                continue  # Nested inside a fold that is already hidden
+            region = self.fold_region(row)
+            if region is not None and region[1] > row:
+                ranges.append((row + 1, region[1]))
+        return ranges
+
+
+def _nonblank(summary, state):
+    """Search test: a non-blank line"""
+    return summary[4] != _BLANK, state
+
+
+def _match_closer(summary, need):
+    """Search test: the line closing the need-th open bracket"""
+    return summary[1] >= need, need - summary[1] + summary[2]
+
+
+def _match_opener(summary, need):
+    """Search test: the line opening the need-th closed bracket"""
+    return summary[2] >= need, need - summary[2] + summary[1]
+
+
+def _unmatched_col(tokens, need, wanted):
+    """
+    Find the need-th bracket of a kind left unmatched within a line
+    
+    Args:
+        tokens (tuple): (col, bracket) pairs in scan order
+        need (int): Which unmatched bracket to find, counting from 1
+        wanted (str): CLOSERS when scanning forwards, OPENERS when scanning backwards
+    
+    Returns:
+        int: Column of the bracket
+    """
+    depth = 0
+    for col, char in tokens:
+        if char not in wanted:
+            depth += 1
+        elif depth:
+            depth -= 1
+        else:
+            need -= 1
+            if need == 0:
+                return col
+    return None
\ No newline at end of file
@@ -5,10 +5,55 @@ Manages the text content and cursor position.
 
 import os
 
+from . import line_ops
+from .line_store import LineStore
+from .macro import Macro
+
+
+class BufferSnapshot:
+    """Read-only view of a TextBuffer at a point in time"""
+    
+    def __init__(self, buffer):
+        """
+        Capture the state of a buffer
+        
+        Args:
+            buffer (TextBuffer): The buffer to capture
+        """
+        self.lines = buffer.lines.snapshot()
+        self.cursor_row = buffer.cursor_row
+        self.cursor_col = buffer.cursor_col
+        self.filename = buffer.filename
+        self.modified = buffer.modified
+    
+    def get_text(self):
+        """
+        Get the entire text content as a string
+        
+        Returns:
+            str: The full text content
+        """
+        return '\n'.join(self.lines)
+
 
 class TextBuffer:
     """Manages the text content and cursor position"""
     
+    # Bulk line operations on ranges larger than this many characters
+    # sort with an external merge sort instead of in memory
+    external_sort_threshold = 256 * 1024 * 1024
+    
+    # Number of bulk line operations that can be undone
+    undo_limit = 100
+    
+    # Codec used by compress_cold ('zlib' or 'lzma'), or None to keep
+    # every line decoded
+    compression = None
+    
+    # Seconds a block of lines must go untouched before compress_cold
+    # compresses it
+    compress_idle = 300
+    
     def __init__(self):
         """Initialize a new text buffer"""
         self.lines = ['']
@@ -16,6 +61,91 @@ class TextBuffer:
         self.cursor_col = 0
         self.filename = None
         self.modified = False
+        self.recording = None
+        self.listeners = []
+        self.undo_stack = []  # (start, end, replaced lines, cursor row, cursor col) per bulk operation
+    
+    @property
+    def lines(self):
+        """LineStore holding the buffer content, one string per line"""
+        return self._lines
+    
+    @lines.setter
+    def lines(self, lines):
+        old_lines = getattr(self, '_lines', None)
+        if isinstance(lines, LineStore):
+            self._lines = lines.copy() if lines.read_only else lines
+        else:
+            self._lines = LineStore(lines)
+        if old_lines is not None:
+            self.cursor_row = min(self.cursor_row, len(self._lines) - 1)
+            self.cursor_col = min(self.cursor_col, len(self._lines[self.cursor_row]))
+            self._notify(0, len(old_lines), len(self._lines))
+    
+    def snapshot(self):
+        """
+        Take an immutable snapshot of the buffer
+        
+        The snapshot takes O(1) time and shares unchanged storage with the
+        buffer, so background work can read it while editing continues.
+        
+        Returns:
+            BufferSnapshot: The captured buffer state
+        """
+        return BufferSnapshot(self)
+    
+    def add_listener(self, callback):
+        """
+        Register a callback for line changes
+        
+        The callback is called as callback(start, old_end, new_end) after
+        lines[start:old_end] have been replaced by lines[start:new_end].
+        
+        Args:
+            callback (callable): Function to call on every change
+        """
+        self.listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        """
+        Unregister a line change callback
+        
+        Args:
+            callback (callable): A callback previously passed to add_listener
+        """
+        self.listeners.remove(callback)
+    
+    def _notify(self, start, old_end, new_end, bulk=False):
+        """
+        Tell listeners that lines[start:old_end] became lines[start:new_end]
+        
+        Edits other than bulk line operations and their undo invalidate the
+        row ranges in the undo stack, so they clear it.
+        """
+        if not bulk:
+            self.undo_stack.clear()
+        for callback in self.listeners:
+            callback(start, old_end, new_end)
+    
+    def start_recording(self):
+        """Start recording buffer operations into a new macro"""
+        self.recording = Macro()
+    
+    def stop_recording(self):
+        """
+        Stop recording buffer operations
+        
+        Returns:
+            Macro: The recorded macro, or None if nothing was being recorded
+        """
+        macro = self.recording
+        self.recording = None
+        return macro
+    
+    def _record(self, operation, *args):
+        """Append an operation to the macro being recorded, if any"""
+        if self.recording is not None:
+            self.recording.add(operation, *args)
     
     def insert_char(self, char):
         """
@@ -29,6 +159,22 @@ class TextBuffer:
         self.lines[self.cursor_row] = new_line
         self.cursor_col += 1
         self.modified = True
+        self._notify(self.cursor_row, self.cursor_row + 1, self.cursor_row + 1)
+        self._record('insert_char', char)
+    
+    def insert_text(self, text):
+        """
+        Insert a run of characters at the current cursor position
+        
+        Args:
+            text (str): The text to insert (without newlines)
+        """
+        current_line = self.lines[self.cursor_row]
+        self.lines[self.cursor_row] = current_line[:self.cursor_col] + text + current_line[self.cursor_col:]
+        self.cursor_col += len(text)
+        self.modified = True
+        self._notify(self.cursor_row, self.cursor_row + 1, self.cursor_row + 1)
+        self._record('insert_text', text)
     
     def insert_newline(self):
         """Insert a new line at the current cursor position"""
@@ -38,9 +184,12 @@ class TextBuffer:
         self.cursor_row += 1
         self.cursor_col = 0
         self.modified = True
+        self._notify(self.cursor_row - 1, self.cursor_row, self.cursor_row + 1)
+        self._record('insert_newline')
     
     def backspace(self):
         """Delete the character before the cursor"""
+        self._record('backspace')
         if self.cursor_col > 0:
             # Delete character in current line
             current_line = self.lines[self.cursor_row]
@@ -48,6 +197,7 @@ class TextBuffer:
             self.lines[self.cursor_row] = new_line
             self.cursor_col -= 1
             self.modified = True
+            self._notify(self.cursor_row, self.cursor_row + 1, self.cursor_row + 1)
         elif self.cursor_row > 0:
             # Join with previous line
             previous_line = self.lines[self.cursor_row - 1]
@@ -57,21 +207,25 @@ class TextBuffer:
             self.lines.pop(self.cursor_row)
             self.cursor_row -= 1
             self.modified = True
+            self._notify(self.cursor_row, self.cursor_row + 2, self.cursor_row + 1)
     
     def delete(self):
         """Delete the character at the cursor"""
+        self._record('delete')
         current_line = self.lines[self.cursor_row]
         if self.cursor_col < len(current_line):
             # Delete character in current line
             new_line = current_line[:self.cursor_col] + current_line[self.cursor_col+1:]
             self.lines[self.cursor_row] = new_line
             self.modified = True
+            self._notify(self.cursor_row, self.cursor_row + 1, self.cursor_row + 1)
         elif self.cursor_row < len(self.lines) - 1:
             # Join with next line
             next_line = self.lines[self.cursor_row + 1]
             self.lines[self.cursor_row] = current_line + next_line
             self.lines.pop(self.cursor_row + 1)
             self.modified = True
+            self._notify(self.cursor_row, self.cursor_row + 2, self.cursor_row + 1)
     
     def move_cursor(self, rows=0, cols=0):
         """
@@ -81,6 +235,7 @@ class TextBuffer:
             rows (int): Number of rows to move (negative for up)
             cols (int): Number of columns to move (negative for left)
         """
+        self._record('move_cursor', rows, cols)
         if rows != 0:
             self.cursor_row = max(0, min(len(self.lines) - 1, self.cursor_row + rows))
             # Adjust column if new line is shorter
@@ -104,6 +259,195 @@ class TextBuffer:
                     self.cursor_row += 1
                     self.cursor_col = 0
     
+    def set_cursor(self, row, col, record=True):
+        """
+        Move the cursor to a position, clamped to the buffer
+        
+        The move is recorded as a jump relative to the current position, so
+        macros repeat the jump rather than return to the same place.
+        
+        Args:
+            row (int): Target row
+            col (int): Target column
+            record (bool): Whether to record the move in the macro being recorded
+        """
+        if record:
+            self._record('jump_cursor', row - self.cursor_row, col - self.cursor_col)
+        self.cursor_row = max(0, min(len(self.lines) - 1, row))
+        self.cursor_col = max(0, min(len(self.lines[self.cursor_row]), col))
+    
+    def jump_cursor(self, rows, cols):
+        """
+        Move the cursor by a number of rows and columns without wrapping at line ends
+        
+        Args:
+            rows (int): Number of rows to move (negative for up)
+            cols (int): Number of columns to move (negative for left)
+        """
+        self.set_cursor(self.cursor_row + rows, self.cursor_col + cols)
+    
+    def _line_range(self, start, end):
+        """Clamp an optional line range to the buffer"""
+        count = len(self.lines)
+        end = count if end is None else max(0, min(end, count))
+        return max(0, min(start, end)), end
+    
+    def _replace_lines(self, start, old_lines, lines):
+        """
+        Replace a range of lines as one undoable change
+        
+        Nothing is recorded or reported if the lines are unchanged.
+        
+        Args:
+            start (int): First line to replace
+            old_lines (list): The lines currently in the range
+            lines (iterable): The replacement lines
+            
+        Returns:
+            int: Number of lines in the range after the change
+        """
+        lines = list(lines)
+        if lines == old_lines:
+            return len(lines)
+        end = start + len(old_lines)
+        old_count = len(self.lines)
+        self.lines.replace(start, end, lines)
+        new_end = end + len(self.lines) - old_count
+        # Kept as a LineStore so compress_cold can compress the undo history too
+        self.undo_stack.append((start, new_end, LineStore(old_lines), self.cursor_row, self.cursor_col))
+        del self.undo_stack[:-self.undo_limit]
+        self.cursor_row = min(self.cursor_row, len(self.lines) - 1)
+        self.cursor_col = min(self.cursor_col, len(self.lines[self.cursor_row]))
+        self.modified = True
+        self._notify(start, end, new_end, bulk=True)
+        return new_end - start
+    
+    def sort_lines(self, start=0, end=None, reverse=False, ignore_case=False):
+        """
+        Sort a range of lines
+        
+        Ranges over external_sort_threshold characters are sorted with an
+        external merge sort using temporary files and worker processes.
+        
+        Args:
+            start (int): First line of the range
+            end (int, optional): Line after the last line of the range. If None, sorts to the end.
+            reverse (bool): Sort in descending order
+            ignore_case (bool): Compare lines case-insensitively
+            
+        Returns:
+            int: Number of lines in the range after the change
+        """
+        start, end = self._line_range(start, end)
+        old_lines = self.lines[start:end]
+        if sum(map(len, old_lines)) > self.external_sort_threshold:
+            lines = line_ops.external_sort(old_lines, reverse, ignore_case)
+        else:
+            lines = line_ops.sort_lines(old_lines, reverse, ignore_case)
+        return self._replace_lines(start, old_lines, lines)
+    
+    def unique_lines(self, start=0, end=None):
+        """
+        Remove repeated lines from a range, keeping the first occurrence
+        
+        Args:
+            start (int): First line of the range
+            end (int, optional): Line after the last line of the range. If None, runs to the end.
+            
+        Returns:
+            int: Number of lines in the range after the change
+        """
+        start, end = self._line_range(start, end)
+        old_lines = self.lines[start:end]
+        return self._replace_lines(start, old_lines, line_ops.unique_lines(old_lines))
+    
+    def filter_lines(self, pattern, start=0, end=None, invert=False):
+        """
+        Keep only the lines of a range that match a regular expression
+        
+        Args:
+            pattern (str): Regular expression searched for in each line
+            start (int): First line of the range
+            end (int, optional): Line after the last line of the range. If None, runs to the end.
+            invert (bool): Keep the lines that do not match instead
+            
+        Returns:
+            int: Number of lines in the range after the change
+        """
+        start, end = self._line_range(start, end)
+        old_lines = self.lines[start:end]
+        lines = line_ops.filter_lines(old_lines, pattern, invert)
+        if not lines and start == 0 and end == len(self.lines):
+            lines = ['']  # A buffer always has at least one line
+        return self._replace_lines(start, old_lines, lines)
+    
+    def reverse_lines(self, start=0, end=None):
+        """
+        Reverse the order of a range of lines
+        
+        Args:
+            start (int): First line of the range
+            end (int, optional): Line after the last line of the range. If None, runs to the end.
+            
+        Returns:
+            int: Number of lines in the range after the change
+        """
+        start, end = self._line_range(start, end)
+        old_lines = self.lines[start:end]
+        return self._replace_lines(start, old_lines, line_ops.reverse_lines(old_lines))
+    
+    def undo(self):
+        """
+        Undo the last bulk line operation
+        
+        Only bulk line operations are undoable; any other edit clears the
+        undo stack.
+        
+        Returns:
+            bool: True if an operation was undone, False if there was nothing to undo
+        """
+        if not self.undo_stack:
+            return False
+        start, new_end, old_lines, self.cursor_row, self.cursor_col = self.undo_stack.pop()
+        self.lines.replace(start, new_end, old_lines)
+        self.modified = True
+        self._notify(start, new_end, start + len(old_lines), bulk=True)
+        return True
+    
+    def compress_cold(self, idle=None):
+        """
+        Compress blocks of lines that have not been read or edited recently
+        
+        Does nothing unless compression is set. Meant to be called
+        periodically; compressed lines decompress on demand. Lines kept for
+        undo are only read by undo(), so they are compressed regardless of
+        idle time.
+        
+        Args:
+            idle (float, optional): Seconds a block must have gone untouched.
+                Defaults to compress_idle.
+        
+        Returns:
+            int: Number of blocks compressed
+        """
+        if not self.compression:
+            return 0
+        compressed = self.lines.compress_cold(self.compression, self.compress_idle if idle is None else idle)
+        for entry in self.undo_stack:
+            compressed += entry[2].compress_cold(self.compression)
+        return compressed
+    
+    def compression_stats(self):
+        """
+        Report the memory saved by compression and the cost of decompressing
+        
+        Covers the lines, their snapshots and the undo history.
+        
+        Returns:
+            dict: Statistics from LineStore.compression_stats
+        """
+        return self.lines.compression_stats(*(entry[2] for entry in self.undo_stack))
+    
     def get_text(self):
         """
         Get the entire text content as a string
@@ -126,12 +470,10 @@ class TextBuffer:
         try:
             with open(filename, 'r') as f:
                 content = f.read()
-                self.lines = content.splitlines()
-                if not self.lines:
-                    self.lines = ['']
-                self.filename = filename
                 self.cursor_row = 0
                 self.cursor_col = 0
+                self.lines = content.splitlines() or ['']
+                self.filename = filename
                 self.modified = False
             return True
         except Exception as e:
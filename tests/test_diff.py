@@ -0,0 +1,156 @@
+"""
+Tests for the buffer-vs-disk diff engine.
+"""
+
+import unittest
+import random
+import tempfile
+import os
+from unittest.mock import patch
+from pytedit.diff import DiffEngine, diff_lines, ADDED, CHANGED, DELETED
+from pytedit.text_buffer import TextBuffer
+
+
+def apply_opcodes(a, b, opcodes):
+    """Rebuild b from a and the opcodes, checking equal runs really match"""
+    result = []
+    for tag, a0, a1, b0, b1 in opcodes:
+        if tag == 'equal':
+            assert a[a0:a1] == b[b0:b1]
+            result.extend(a[a0:a1])
+        else:
+            result.extend(b[b0:b1])
+    return result
+
+
+def edit_distance(a, b):
+    """Number of inserted plus deleted lines in a shortest edit script"""
+    lcs = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) - 1, -1, -1):
+        for j in range(len(b) - 1, -1, -1):
+            if a[i] == b[j]:
+                lcs[i][j] = lcs[i + 1][j + 1] + 1
+            else:
+                lcs[i][j] = max(lcs[i + 1][j], lcs[i][j + 1])
+    return len(a) + len(b) - 2 * lcs[0][0]
+
+
+class TestDiffLines(unittest.TestCase):
+    """Test the Myers diff"""
+    
+    def test_identical(self):
+        """Test identical sequences give a single equal opcode"""
+        self.assertEqual(diff_lines([1, 2, 3], [1, 2, 3]), [('equal', 0, 3, 0, 3)])
+    
+    def test_random_sequences(self):
+        """Test random diffs are valid and minimal"""
+        rng = random.Random(42)
+        for _ in range(300):
+            a = [rng.randrange(4) for _ in range(rng.randrange(12))]
+            b = [rng.randrange(4) for _ in range(rng.randrange(12))]
+            opcodes = diff_lines(a, b)
+            self.assertEqual(apply_opcodes(a, b, opcodes), b)
+            changed = sum((a1 - a0) + (b1 - b0) for tag, a0, a1, b0, b1 in opcodes if tag != 'equal')
+            self.assertEqual(changed, edit_distance(a, b))
+    
+    def test_max_cost(self):
+        """Test regions over the cost limit become a valid replacement"""
+        a = list(range(50))
+        b = list(range(50, 100))
+        opcodes = diff_lines(a, b, max_cost=3)
+        self.assertEqual(apply_opcodes(a, b, opcodes), b)
+
+
+class TestDiffEngine(unittest.TestCase):
+    """Test the DiffEngine class functionality"""
+    
+    def setUp(self):
+        """Load a buffer from a temporary file and attach a diff engine"""
+        handle, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(handle, 'w') as f:
+            f.write('\n'.join(f'line {i}' for i in range(20)))
+        self.buffer = TextBuffer()
+        self.buffer.load_file(self.path)
+        self.diff = DiffEngine(self.buffer)
+        self.assertTrue(self.diff.load_baseline())
+    
+    def tearDown(self):
+        os.remove(self.path)
+    
+    def test_unmodified(self):
+        """Test a freshly loaded buffer is unmodified"""
+        self.assertFalse(self.diff.is_modified())
+        self.assertTrue(self.diff.baseline.read_only)  # Shares the buffer's storage
+        self.assertEqual(self.diff.line_markers(0, 20), {})
+    
+    def test_markers(self):
+        """Test added, changed and deleted lines are marked"""
+        self.buffer.cursor_row = 2
+        self.buffer.insert_char('x')
+        self.buffer.cursor_row, self.buffer.cursor_col = 5, 6
+        self.buffer.insert_newline()
+        self.buffer.cursor_row, self.buffer.cursor_col = 11, 0
+        self.buffer.backspace()
+        markers = self.diff.line_markers(0, len(self.buffer.lines))
+        self.assertEqual(markers[2], CHANGED)
+        self.assertIn(markers[6], (ADDED, CHANGED))
+        self.assertEqual(markers[10], CHANGED)
+        self.assertNotIn(0, markers)
+    
+    def test_delete_marker(self):
+        """Test a deleted line marks the row below it"""
+        self.buffer.cursor_row, self.buffer.cursor_col = 3, 0
+        self.buffer.backspace()
+        self.buffer.cursor_col = len(self.buffer.lines[2])
+        for _ in range(len('line 3')):
+            self.buffer.backspace()
+        self.assertEqual(self.diff.line_markers(0, 20), {3: DELETED})
+    
+    def test_undo_by_hand(self):
+        """Test reverting an edit by hand clears the modified state"""
+        self.buffer.cursor_row = 4
+        self.buffer.insert_char('x')
+        self.assertTrue(self.diff.is_modified())
+        self.buffer.backspace()
+        self.assertFalse(self.diff.is_modified())
+        self.assertFalse(self.buffer.modified)
+    
+    def test_incremental_matches_buffer(self):
+        """Test incremental updates stay valid across random edits"""
+        rng = random.Random(7)
+        operations = [self.buffer.insert_newline, self.buffer.backspace,
+                      self.buffer.delete, lambda: self.buffer.insert_char('y')]
+        for step in range(300):
+            self.buffer.cursor_row = rng.randrange(len(self.buffer.lines))
+            self.buffer.cursor_col = rng.randrange(len(self.buffer.lines[self.buffer.cursor_row]) + 1)
+            rng.choice(operations)()
+            if step % 10 == 0:
+                baseline = [f'line {i}' for i in range(20)]
+                opcodes = self.diff.get_opcodes()
+                self.assertEqual(apply_opcodes(baseline, self.buffer.lines, opcodes), self.buffer.lines)
+    
+    def test_edit_inside_large_change(self):
+        """Test edits inside a change larger than max_cost widen it without re-diffing"""
+        self.buffer.lines = [f'line {i}' for i in range(20)]
+        diff = DiffEngine(self.buffer, max_cost=5)
+        diff.set_baseline()
+        self.buffer.reverse_lines()
+        self.assertTrue(diff.is_modified())
+        baseline = [f'line {i}' for i in range(20)]
+        self.buffer.cursor_row, self.buffer.cursor_col = 10, 0
+        self.buffer.insert_char('x')
+        with patch('pytedit.diff.diff_lines') as diff_lines_mock:
+            opcodes = diff.get_opcodes()
+        diff_lines_mock.assert_not_called()
+        self.assertEqual(apply_opcodes(baseline, self.buffer.lines, opcodes), self.buffer.lines)
+    
+    def test_set_baseline(self):
+        """Test saving resets the baseline"""
+        self.buffer.insert_char('x')
+        self.buffer.save_file()
+        self.diff.set_baseline()
+        self.assertFalse(self.diff.is_modified())
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
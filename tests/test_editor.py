@@ -6,7 +6,9 @@ import unittest
 from unittest.mock import MagicMock, patch
 import tempfile
 import os
+from prompt_toolkit.keys import Keys
 from pytedit.editor import Editor
+from pytedit.macro import Macro
 
 
 class TestEditor(unittest.TestCase):
@@ -57,6 +59,72 @@ class TestEditor(unittest.TestCase):
         # Assert the app.run was called
         self.editor.app.run.assert_called_once()
     
+    def test_refresh_with_collapsed_fold(self):
+        """Test collapsed folds are left out of the displayed text"""
+        self.editor.buffer.lines = ['if x:', '    a', '    b', 'c']
+        self.editor.structure.rebuild()
+        self.editor.structure.toggle_fold(0)
+        self.editor.buffer.cursor_row = 3
+        
+        Editor.refresh_screen(self.editor)
+        self.assertEqual(self.editor.text_buffer.text, 'if x: ...\nc')
+        self.assertEqual(self.editor.buffer_row(1), 3)
+        
+        # Moving the cursor into the fold expands it
+        self.editor.buffer.cursor_row = 1
+        Editor.refresh_screen(self.editor)
+        self.assertEqual(self.editor.text_buffer.text, 'if x:\n    a\n    b\nc')
+    
+    def test_jumps_are_recorded(self):
+        """Test structure jumps are recorded and fold skips are not"""
+        buffer = self.editor.buffer
+        buffer.lines = ['f(a,', '  b)', 'if x:', '    y', 'z']
+        self.editor.structure.rebuild()
+        self.editor.structure.toggle_fold(2)
+        buffer.cursor_row, buffer.cursor_col = 0, 1
+        buffer.start_recording()
+        
+        binding = self.editor.bindings.get_bindings_for_keys((Keys.ControlSquareClose,))[0]
+        binding.handler(MagicMock())
+        self.assertEqual((buffer.cursor_row, buffer.cursor_col), (1, 3))
+        buffer.move_cursor(rows=1)
+        buffer.move_cursor(rows=1)
+        self.editor.skip_folds(1)
+        self.assertEqual(buffer.cursor_row, 4)
+        
+        macro = buffer.stop_recording()
+        self.assertEqual(macro.operations, [
+            ('jump_cursor', (1, 2)),
+            ('move_cursor', (1, 0)),
+            ('move_cursor', (1, 0)),
+        ])
+        
+        # Playback repeats the jump from wherever the cursor is
+        buffer.cursor_row, buffer.cursor_col = 1, 0
+        Macro(macro.operations[:1]).apply(buffer, times=2)
+        self.assertEqual((buffer.cursor_row, buffer.cursor_col), (3, 4))
+    
+    def test_refresh_renders_viewport(self):
+        """Test only the rows on screen are rendered, decompressing only their blocks"""
+        buffer = self.editor.buffer
+        buffer.lines = [f'line {i}' for i in range(5000)]
+        buffer.compression = 'zlib'
+        self.assertEqual(buffer.compress_cold(idle=0), 5)
+        self.editor.view_height = lambda: 10
+        
+        buffer.cursor_row, buffer.cursor_col = 3000, 2
+        Editor.refresh_screen(self.editor)
+        self.assertEqual(self.editor.text_buffer.text, '\n'.join(f'line {i}' for i in range(2991, 3001)))
+        self.assertEqual(self.editor.buffer_row(9), 3000)
+        
+        # Scrolling up a little keeps the view, and rendering again does not decompress
+        decompressions = buffer.compression_stats()['decompressions']
+        buffer.cursor_row = 2995
+        Editor.refresh_screen(self.editor)
+        self.assertEqual(self.editor.top, 2991)
+        self.assertEqual(buffer.compression_stats()['decompressions'], decompressions)
+        self.assertLessEqual(decompressions, 1)
+    
     def test_key_bindings_creation(self):
         """Test key bindings are created properly"""
         kb = self.editor.create_key_bindings()
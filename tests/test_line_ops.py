@@ -0,0 +1,131 @@
+"""
+Tests for bulk line operations.
+"""
+
+import unittest
+import random
+from pytedit import line_ops
+from pytedit.diff import DiffEngine
+from pytedit.structure import StructureIndex
+from pytedit.text_buffer import TextBuffer
+
+
+class TestLineOps(unittest.TestCase):
+    """Test the line operation functions"""
+    
+    def test_unique(self):
+        """Test duplicates are removed keeping the first occurrence"""
+        self.assertEqual(line_ops.unique_lines(['b', 'a', 'b', 'c', 'a']), ['b', 'a', 'c'])
+    
+    def test_filter(self):
+        """Test filtering by regular expression"""
+        lines = ['ERROR x', 'info y', 'ERROR z']
+        self.assertEqual(line_ops.filter_lines(lines, r'^ERROR'), ['ERROR x', 'ERROR z'])
+        self.assertEqual(line_ops.filter_lines(lines, r'^ERROR', invert=True), ['info y'])
+    
+    def test_external_sort(self):
+        """Test the external merge sort matches an in-memory sort"""
+        rng = random.Random(5)
+        lines = [''.join(rng.choice('abcABC \t\r\udc80') for _ in range(rng.randrange(6))) for _ in range(500)]
+        originals = set(map(id, lines))
+        for reverse in (False, True):
+            for ignore_case in (False, True):
+                result = list(line_ops.external_sort(lines, reverse, ignore_case, run_size=64, workers=2))
+                self.assertEqual(result, line_ops.sort_lines(lines, reverse, ignore_case))
+                # The result reuses the original strings rather than copies read from disk
+                self.assertTrue(all(id(line) in originals for line in result))
+
+
+class TestBufferLineOps(unittest.TestCase):
+    """Test bulk line operations on TextBuffer"""
+    
+    def setUp(self):
+        """Set up a buffer with a few lines"""
+        self.buffer = TextBuffer()
+        self.buffer.lines = ['header', 'pear', 'apple', 'pear', 'Fig', 'footer']
+    
+    def test_sort_range(self):
+        """Test sorting part of the buffer"""
+        self.assertEqual(self.buffer.sort_lines(1, 5, ignore_case=True), 4)
+        self.assertEqual(self.buffer.lines, ['header', 'apple', 'Fig', 'pear', 'pear', 'footer'])
+    
+    def test_external_sort(self):
+        """Test sorting above the memory threshold"""
+        self.buffer.external_sort_threshold = 0
+        self.buffer.sort_lines(reverse=True)
+        self.assertEqual(self.buffer.lines, ['pear', 'pear', 'header', 'footer', 'apple', 'Fig'])
+    
+    def test_unique_filter_reverse(self):
+        """Test unique, filter and reverse on the whole buffer"""
+        self.assertEqual(self.buffer.unique_lines(), 5)
+        self.assertEqual(self.buffer.filter_lines('e', invert=True), 1)
+        self.assertEqual(self.buffer.lines, ['Fig'])
+        self.assertEqual(self.buffer.filter_lines('nothing'), 1)
+        self.assertEqual(self.buffer.lines, [''])
+        self.buffer.lines = ['a', 'b', 'c']
+        self.buffer.reverse_lines(1)
+        self.assertEqual(self.buffer.lines, ['a', 'c', 'b'])
+    
+    def test_undo(self):
+        """Test each bulk operation undoes in one step"""
+        self.buffer.cursor_row = 5
+        self.buffer.unique_lines()
+        self.buffer.sort_lines()
+        self.assertEqual(self.buffer.cursor_row, 4)
+        self.assertTrue(self.buffer.undo())
+        self.assertEqual(self.buffer.lines, ['header', 'pear', 'apple', 'Fig', 'footer'])
+        self.assertTrue(self.buffer.undo())
+        self.assertEqual(self.buffer.lines, ['header', 'pear', 'apple', 'pear', 'Fig', 'footer'])
+        self.assertEqual(self.buffer.cursor_row, 5)
+        self.assertFalse(self.buffer.undo())
+    
+    def test_unchanged_range(self):
+        """Test an operation that changes nothing is not undoable and leaves the buffer unmodified"""
+        self.buffer.modified = False
+        calls = []
+        self.buffer.add_listener(lambda *args: calls.append(args))
+        self.assertEqual(self.buffer.sort_lines(1, 3, reverse=True), 2)
+        self.assertEqual(self.buffer.unique_lines(0, 3), 3)
+        self.assertFalse(self.buffer.modified)
+        self.assertEqual(calls, [])
+        self.assertFalse(self.buffer.undo())
+    
+    def test_edit_clears_undo(self):
+        """Test a keystroke after a bulk operation cannot be undone past"""
+        self.buffer.lines = ['a', 'b', 'c', 'f', 'e', 'd', 'g']
+        diff = DiffEngine(self.buffer)
+        diff.set_baseline()
+        self.buffer.sort_lines(3, 6)
+        self.buffer.cursor_row, self.buffer.cursor_col = 0, 0
+        self.buffer.insert_char('x')
+        self.assertFalse(self.buffer.undo())
+        self.assertEqual(self.buffer.lines, ['xa', 'b', 'c', 'd', 'e', 'f', 'g'])
+        self.assertTrue(diff.is_modified())
+    
+    def test_undo_notifies_range(self):
+        """Test undo replaces and reports only the range that changed"""
+        self.buffer.lines = ['if (', 'b', 'a', ')', 'x', 'x']
+        structure = StructureIndex(self.buffer)
+        structure.rebuild()
+        self.buffer.unique_lines(4)
+        self.buffer.sort_lines(1, 3)
+        self.buffer.undo()
+        self.buffer.undo()
+        self.assertEqual(self.buffer.lines, ['if (', 'b', 'a', ')', 'x', 'x'])
+        rows = [structure._info(row) for row in range(len(self.buffer.lines))]
+        structure.rebuild()
+        self.assertEqual(rows, [structure._info(row) for row in range(len(self.buffer.lines))])
+        self.assertEqual(structure.matching_bracket(0, 3), (3, 0))
+    
+    def test_listeners(self):
+        """Test listeners see bulk operations and their undo"""
+        diff = DiffEngine(self.buffer)
+        diff.set_baseline()
+        self.buffer.filter_lines('p', 1, 5)
+        self.assertTrue(diff.is_modified())
+        self.buffer.undo()
+        self.assertFalse(diff.is_modified())
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
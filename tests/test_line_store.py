@@ -0,0 +1,306 @@
+"""
+Tests for copy-on-write line storage and buffer snapshots.
+"""
+
+import unittest
+import gc
+import pickle
+import random
+import sys
+import threading
+import tracemalloc
+from pytedit.diff import DiffEngine
+from pytedit.line_store import LineStore
+from pytedit.structure import StructureIndex
+from pytedit.text_buffer import TextBuffer
+
+
+class SmallLineStore(LineStore):
+    """LineStore with tiny blocks so tests cross block boundaries"""
+    BLOCK_SIZE = 4
+
+
+class TestLineStore(unittest.TestCase):
+    """Test the LineStore class functionality"""
+    
+    def test_list_operations(self):
+        """Test random operations behave like a list"""
+        rng = random.Random(3)
+        expected = [f'line {i}' for i in range(30)]
+        store = SmallLineStore(expected)
+        for step in range(2000):
+            operation = rng.randrange(5)
+            if operation == 0:
+                index = rng.randrange(len(expected) + 1)
+                store.insert(index, f'new {step}')
+                expected.insert(index, f'new {step}')
+            elif operation == 1 and expected:
+                index = rng.randrange(len(expected))
+                self.assertEqual(store.pop(index), expected.pop(index))
+            elif operation == 2 and expected:
+                index = rng.randrange(len(expected))
+                store[index] = f'set {step}'
+                expected[index] = f'set {step}'
+            elif operation == 3:
+                start = rng.randrange(len(expected) + 1)
+                stop = rng.randrange(start, len(expected) + 1)
+                lines = [f'replace {step} {i}' for i in range(rng.randrange(6))]
+                store.replace(start, stop, lines)
+                expected[start:stop] = lines
+            else:
+                start = rng.randrange(len(expected) + 1)
+                self.assertEqual(store[start:start + 7], expected[start:start + 7])
+            self.assertEqual(len(store), len(expected))
+        self.assertEqual(store, expected)
+        self.assertEqual(store[-1], expected[-1])
+    
+    def test_snapshot_is_isolated(self):
+        """Test a snapshot keeps its content while the store changes"""
+        store = SmallLineStore(['a', 'b', 'c', 'd', 'e', 'f'])
+        snapshot = store.snapshot()
+        store[1] = 'B'
+        store.insert(0, 'start')
+        store.pop()
+        self.assertEqual(snapshot, ['a', 'b', 'c', 'd', 'e', 'f'])
+        self.assertEqual(store, ['start', 'a', 'B', 'c', 'd', 'e'])
+    
+    def test_snapshot_shares_blocks(self):
+        """Test a write only copies the block it touches"""
+        store = SmallLineStore([str(i) for i in range(12)])
+        snapshot = store.snapshot()
+        store[0] = 'x'
+        self.assertIsNot(store._blocks[0], snapshot._blocks[0])
+        self.assertIs(store._blocks[1], snapshot._blocks[1])
+        self.assertIs(store._blocks[2], snapshot._blocks[2])
+    
+    def test_snapshot_read_only(self):
+        """Test snapshots reject changes"""
+        snapshot = LineStore(['a']).snapshot()
+        self.assertTrue(snapshot.read_only)
+        with self.assertRaises(TypeError):
+            snapshot[0] = 'b'
+        with self.assertRaises(TypeError):
+            snapshot.insert(0, 'b')
+    
+    def test_pickle(self):
+        """Test snapshots can be sent to other processes"""
+        snapshot = SmallLineStore(['a', 'b', 'c', 'd', 'e']).snapshot()
+        restored = pickle.loads(pickle.dumps(snapshot))
+        self.assertEqual(restored, snapshot)
+        self.assertTrue(restored.read_only)
+
+
+class TestBufferSnapshot(unittest.TestCase):
+    """Test TextBuffer snapshots"""
+    
+    def test_snapshot(self):
+        """Test a buffer snapshot captures text and cursor"""
+        buffer = TextBuffer()
+        buffer.insert_char('a')
+        snapshot = buffer.snapshot()
+        buffer.insert_newline()
+        buffer.insert_char('b')
+        self.assertEqual(snapshot.get_text(), 'a')
+        self.assertEqual(snapshot.cursor_col, 1)
+        self.assertEqual(buffer.get_text(), 'a\nb')
+    
+    def test_restore(self):
+        """Test assigning a snapshot back restores the buffer"""
+        buffer = TextBuffer()
+        buffer.insert_char('a')
+        snapshot = buffer.snapshot()
+        buffer.insert_char('b')
+        buffer.lines = snapshot.lines
+        self.assertEqual(buffer.get_text(), 'a')
+        buffer.insert_char('c')
+        self.assertEqual(snapshot.get_text(), 'a')
+    
+    def test_restore_notifies(self):
+        """Test assigning lines notifies listeners"""
+        buffer = TextBuffer()
+        buffer.lines = ['f(x)', 'b', 'c']
+        diff = DiffEngine(buffer)
+        diff.set_baseline()
+        structure = StructureIndex(buffer)
+        self.assertEqual(structure.matching_bracket(0, 1), (0, 3))
+        snapshot = buffer.snapshot()
+        buffer.cursor_row, buffer.cursor_col = 0, 4
+        buffer.insert_char('(')
+        buffer.lines = snapshot.lines
+        self.assertFalse(diff.is_modified())
+        buffer.lines = ['(']
+        self.assertIsNone(structure.matching_bracket(0, 0))
+        self.assertEqual((buffer.cursor_row, buffer.cursor_col), (0, 1))
+    
+    def test_concurrent_readers(self):
+        """Test readers on other threads see a consistent snapshot"""
+        buffer = TextBuffer()
+        buffer.lines = [f'line {i}' for i in range(5000)]
+        snapshot = buffer.snapshot()
+        expected = snapshot.get_text()
+        results = []
+        
+        def read():
+            for _ in range(20):
+                results.append(snapshot.get_text() == expected)
+        
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for row in range(0, 5000, 7):
+            buffer.cursor_row, buffer.cursor_col = row, 0
+            buffer.insert_char('x')
+            buffer.insert_newline()
+        for reader in readers:
+            reader.join()
+        self.assertTrue(all(results))
+
+
+class SmallCacheLineStore(SmallLineStore):
+    """SmallLineStore with a tiny decompression cache"""
+    CACHE_BLOCKS = 2
+
+
+class TestCompression(unittest.TestCase):
+    """Test compression of cold blocks"""
+    
+    def test_list_operations(self):
+        """Test random operations on compressed blocks behave like a list"""
+        for codec in ('zlib', 'lzma'):
+            rng = random.Random(4)
+            expected = [f'line {i} \udc80' for i in range(40)]
+            store = SmallCacheLineStore(expected)
+            for step in range(1000):
+                if step % 50 == 0:
+                    store.compress_cold(codec)
+                operation = rng.randrange(4)
+                index = rng.randrange(len(expected))
+                if operation == 0:
+                    store.insert(index, f'new {step}')
+                    expected.insert(index, f'new {step}')
+                elif operation == 1 and len(expected) > 1:
+                    self.assertEqual(store.pop(index), expected.pop(index))
+                elif operation == 2:
+                    store[index] = f'set {step}'
+                    expected[index] = f'set {step}'
+                else:
+                    stop = rng.randrange(index, len(expected) + 1)
+                    self.assertEqual(store[index:stop], expected[index:stop])
+                    self.assertEqual(store[index], expected[index])
+                    store[index:stop] = ['replaced']
+                    expected[index:stop] = ['replaced']
+            self.assertEqual(list(store), expected)
+            self.assertLessEqual(len(store._cache), store.CACHE_BLOCKS)
+    
+    def test_stats(self):
+        """Test compression reduces resident size and counts decompressions"""
+        store = SmallCacheLineStore([f'repeated log line {i % 3}' for i in range(100)])
+        self.assertEqual(store.compress_cold(), 25)
+        self.assertEqual(store[50], 'repeated log line 2')
+        self.assertEqual(store[51], 'repeated log line 0')
+        stats = store.compression_stats()
+        self.assertEqual(stats['compressed_blocks'], 25)
+        self.assertEqual(stats['cached_blocks'], 1)
+        self.assertEqual(stats['decompressions'], 1)
+        self.assertGreater(stats['decompress_latency'], 0)
+        self.assertLess(stats['resident_bytes'], stats['uncompressed_bytes'] / 2)
+    
+    def test_idle(self):
+        """Test only blocks untouched for long enough are compressed"""
+        store = SmallLineStore(['a', 'b', 'c\nd', 'e', 'f'])
+        self.assertEqual(store.compress_cold(idle=60), 0)
+        self.assertEqual(store.compress_cold(idle=0), 1)
+        self.assertEqual(store.compression_stats()['compressed_blocks'], 1)
+        with self.assertRaises(ValueError):
+            store.compress_cold('gzip')
+    
+    def test_snapshot(self):
+        """Test compression reaches blocks held by snapshots"""
+        expected = [f'line {i}' for i in range(20)]
+        store = SmallLineStore(expected)
+        snapshot = store.snapshot()
+        store[0] = 'changed'  # The snapshot alone now holds the original first block
+        stats = store.compression_stats()
+        self.assertEqual((stats['blocks'], stats['compressed_blocks']), (6, 0))
+        self.assertEqual(stats['resident_bytes'], stats['uncompressed_bytes'])
+        
+        self.assertEqual(store.compress_cold(), 6)
+        self.assertEqual(snapshot.compression_stats()['compressed_blocks'], 5)
+        self.assertEqual(store.compression_stats()['compressed_blocks'], 6)
+        self.assertEqual(list(snapshot), expected)
+        self.assertEqual(store[0], 'changed')
+        with self.assertRaises(TypeError):
+            snapshot.compress_cold()
+        self.assertEqual(pickle.loads(pickle.dumps(store)), store)
+        self.assertEqual(pickle.loads(pickle.dumps(snapshot)), expected)
+    
+    def test_concurrent_readers(self):
+        """Test threads can read compressed blocks of a snapshot"""
+        expected = [f'line {i}' for i in range(12)]
+        store = SmallCacheLineStore(expected)
+        store.compress_cold()
+        snapshot = store.snapshot()
+        errors = []
+        
+        def read(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(5000):
+                    row = rng.randrange(len(expected))
+                    assert snapshot[row] == expected[row]
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=read, args=(seed,)) for seed in range(8)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # Switch threads often to provoke races
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(snapshot._cache), snapshot.CACHE_BLOCKS)
+    
+    def test_buffer_memory(self):
+        """Test compression frees lines held by snapshots and undo history"""
+        buffer = TextBuffer()
+        buffer.compression = 'zlib'
+        gc.collect()
+        tracemalloc.start()
+        try:
+            buffer.lines = [f'log line {i} with some payload' for i in range(20000)]
+            diff = DiffEngine(buffer)
+            diff.set_baseline()
+            buffer.reverse_lines(0, 200)
+            gc.collect()
+            before = tracemalloc.get_traced_memory()[0]
+            buffer.compress_cold(idle=0)
+            gc.collect()
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(after, before / 3)
+        stats = buffer.compression_stats()
+        self.assertLess(stats['resident_bytes'], stats['uncompressed_bytes'] / 3)
+        self.assertTrue(diff.is_modified())
+        self.assertTrue(buffer.undo())
+        self.assertFalse(diff.is_modified())
+    
+    def test_buffer(self):
+        """Test buffers compress only when compression is set"""
+        buffer = TextBuffer()
+        buffer.lines = [f'line {i}' for i in range(5000)]
+        self.assertEqual(buffer.compress_cold(idle=0), 0)
+        buffer.compression = 'zlib'
+        self.assertEqual(buffer.compress_cold(idle=0), 5)
+        buffer.cursor_row = 4500
+        buffer.insert_char('x')
+        self.assertEqual(buffer.lines[4500], 'xline 4500')
+        self.assertEqual(buffer.compression_stats()['compressed_blocks'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Tests for macro recording and playback.
+"""
+
+import unittest
+import tempfile
+import os
+from pytedit.macro import Macro
+from pytedit.text_buffer import TextBuffer
+
+
+class TestMacro(unittest.TestCase):
+    """Test the Macro class functionality"""
+    
+    def setUp(self):
+        """Set up a buffer with a few lines"""
+        self.buffer = TextBuffer()
+        self.buffer.lines = ['alpha', 'beta', 'gamma']
+    
+    def record(self):
+        """Record a macro that prefixes a line with '- ' and moves down"""
+        self.buffer.start_recording()
+        self.buffer.insert_char('-')
+        self.buffer.insert_char(' ')
+        self.buffer.move_cursor(rows=1)
+        self.buffer.move_cursor(cols=-2)
+        return self.buffer.stop_recording()
+    
+    def test_record(self):
+        """Test buffer operations are recorded"""
+        macro = self.record()
+        self.assertEqual(macro.operations, [
+            ('insert_char', ('-',)),
+            ('insert_char', (' ',)),
+            ('move_cursor', (1, 0)),
+            ('move_cursor', (0, -2)),
+        ])
+        self.assertIsNone(self.buffer.recording)
+    
+    def test_compile_merges_inserts(self):
+        """Test consecutive character inserts compile to one text insert"""
+        macro = self.record()
+        self.assertEqual(macro.compile()[0], ('insert_text', ('- ',)))
+        self.assertEqual(len(macro.compile()), 3)
+    
+    def test_apply(self):
+        """Test applying a macro several times"""
+        macro = self.record()
+        stats = macro.apply(self.buffer, times=2)
+        self.assertEqual(self.buffer.lines, ['- alpha', '- beta', '- gamma'])
+        self.assertEqual(stats['runs'], 2)
+        self.assertEqual(stats['operations'], 8)
+        self.assertGreater(stats['ops_per_second'], 0)
+    
+    def test_apply_to_lines(self):
+        """Test applying a macro once per line, tracking inserted lines"""
+        macro = Macro([('move_cursor', (0, 1)), ('insert_newline', ())])
+        self.buffer.lines = ['ab', 'cd', 'ef']
+        macro.apply_to_lines(self.buffer, 0, 2)
+        self.assertEqual(self.buffer.lines, ['a', 'b', 'c', 'd', 'ef'])
+    
+    def test_unknown_operation(self):
+        """Test unknown operations are rejected"""
+        with self.assertRaises(ValueError):
+            Macro([('get_text', ())])
+    
+    def test_invalid_arguments(self):
+        """Test arguments are checked against each operation"""
+        for operation, args in [('move_cursor', ('x',)), ('move_cursor', (1, True)),
+                                ('insert_text', ('x\ny',)), ('insert_char', ('ab',)),
+                                ('insert_newline', (1,))]:
+            with self.assertRaises(ValueError):
+                Macro([(operation, args)])
+    
+    def test_save_and_load(self):
+        """Test round-tripping a macro through a file"""
+        macro = self.record()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'macro.json')
+            self.assertTrue(macro.save_file(path))
+            loaded = Macro()
+            self.assertTrue(loaded.load_file(path))
+            self.assertEqual(loaded.operations, macro.operations)
+            self.assertFalse(loaded.load_file(os.path.join(tmp, 'missing.json')))
+            with open(path, 'w') as f:
+                f.write('{"operations": [["move_cursor", ["x"]]]}')
+            self.assertFalse(loaded.load_file(path))
+            self.assertEqual(loaded.operations, macro.operations)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Tests for the incremental structure index.
+"""
+
+import unittest
+import random
+from pytedit.structure import StructureIndex, scan_line
+from pytedit.text_buffer import TextBuffer
+
+
+SOURCE = [
+    "def main(args):",
+    "    values = [1, (2, 3),",
+    "              4]",
+    "",
+    "    if values:",
+    "        print('(not a bracket')",
+    "        return {",
+    "            'a': values",
+    "        }",
+    "",
+    "class Thing:",
+    "    pass",
+]
+
+
+class SmallStructureIndex(StructureIndex):
+    """StructureIndex with tiny chunks so queries cross the tree"""
+    CHUNK_SIZE = 2
+
+
+def brute_matches(lines):
+    """Map every bracket position to its partner by scanning the whole text"""
+    matches = {}
+    stack = []
+    for row, line in enumerate(lines):
+        for col, char in scan_line(line)[1]:
+            if char in '([{':
+                stack.append((row, col))
+            elif stack:
+                opener = stack.pop()
+                matches[opener] = (row, col)
+                matches[(row, col)] = opener
+    return matches
+
+
+def brute_folds(lines):
+    """Rows where a fold starts"""
+    indents = [scan_line(line)[0] for line in lines]
+    folds = []
+    for row, indent in enumerate(indents):
+        following = [i for i in indents[row + 1:] if i >= 0]
+        if indent >= 0 and following and following[0] > indent:
+            folds.append(row)
+    return folds
+
+
+class TestStructureIndex(unittest.TestCase):
+    """Test the StructureIndex class functionality"""
+    
+    def setUp(self):
+        """Set up a buffer with some Python-like source"""
+        self.buffer = TextBuffer()
+        self.buffer.lines = list(SOURCE)
+        self.index = SmallStructureIndex(self.buffer)
+    
+    def test_unclosed_quote(self):
+        """Test a quote with no closing quote does not hide brackets"""
+        self.assertEqual(scan_line("# don't f(x)")[1], ((9, '('), (11, ')')))
+        self.assertEqual(scan_line("struct Ref<'a> { x: f(y) }")[1], ((15, '{'), (21, '('), (23, ')'), (25, '}')))
+    
+    def test_scan_line(self):
+        """Test brackets in strings are skipped"""
+        indent, tokens, closes, opens = scan_line("  f(')', \"\\\"(\") ]")
+        self.assertEqual(indent, 2)
+        self.assertEqual(tokens, ((3, '('), (14, ')'), (16, ']')))
+        self.assertEqual((closes, opens), (1, 0))
+    
+    def test_matching_bracket(self):
+        """Test brackets match within and across lines"""
+        self.assertEqual(self.index.matching_bracket(0, 8), (0, 13))
+        self.assertEqual(self.index.matching_bracket(1, 13), (2, 15))
+        self.assertEqual(self.index.matching_bracket(2, 15), (1, 13))
+        self.assertEqual(self.index.matching_bracket(6, 15), (8, 8))
+        self.assertIsNone(self.index.matching_bracket(0, 0))
+    
+    def test_folds(self):
+        """Test fold starts and regions"""
+        self.assertEqual(self.index.next_fold(-1), 0)
+        self.assertEqual(self.index.next_fold(0), 1)
+        self.assertEqual(self.index.next_fold(1), 4)
+        self.assertEqual(self.index.fold_region(4), (4, 8))
+        self.assertEqual(self.index.fold_region(0), (0, 8))
+        self.assertIsNone(self.index.fold_region(3))
+    
+    def test_enclosing_block(self):
+        """Test the enclosing indentation block"""
+        self.assertEqual(self.index.enclosing_block(5), (4, 8))
+        self.assertEqual(self.index.enclosing_block(4), (0, 8))
+        self.assertEqual(self.index.enclosing_block(11), (10, 11))
+        self.assertIsNone(self.index.enclosing_block(0))
+    
+    def test_collapse(self):
+        """Test collapsed folds hide their lines and follow edits"""
+        self.assertEqual(self.index.toggle_fold(5), 4)
+        self.assertEqual(self.index.hidden_ranges(), [(5, 8)])
+        self.buffer.cursor_row, self.buffer.cursor_col = 0, 0
+        self.buffer.insert_newline()
+        self.assertEqual(self.index.hidden_ranges(), [(6, 9)])
+        self.assertEqual(self.index.toggle_fold(1), 1)
+        self.assertEqual(self.index.hidden_ranges(), [(2, 9)])
+    
+    def test_random_edits(self):
+        """Test the index matches a full rescan after random edits"""
+        rng = random.Random(11)
+        operations = [self.buffer.insert_newline, self.buffer.backspace, self.buffer.delete,
+                      lambda: self.buffer.insert_char(rng.choice('()[]{} x')),
+                      lambda: self.buffer.insert_text('    ')]
+        for step in range(400):
+            self.buffer.cursor_row = rng.randrange(len(self.buffer.lines))
+            self.buffer.cursor_col = rng.randrange(len(self.buffer.lines[self.buffer.cursor_row]) + 1)
+            rng.choice(operations)()
+            if step % 20:
+                continue
+            lines = list(self.buffer.lines)
+            self.assertEqual(len(self.index), len(lines))
+            matches = brute_matches(lines)
+            for (row, col), partner in matches.items():
+                self.assertEqual(self.index.matching_bracket(row, col), partner)
+            folds = []
+            row = self.index.next_fold(-1)
+            while row is not None:
+                folds.append(row)
+                row = self.index.next_fold(row)
+            self.assertEqual(folds, brute_folds(lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file